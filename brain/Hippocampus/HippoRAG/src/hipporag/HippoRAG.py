@@ -73,6 +73,8 @@ class HippoRAG:
                 when a rerank file path is specified in the global configuration.
             ready_to_retrieve (bool): A flag indicating whether the system is ready for retrieval
                 operations.
+            index_version (int): Monotonically increasing counter, bumped whenever `index` or `delete`
+                changes the graph, so callers can invalidate cached retrieval results.
 
         Parameters:
             global_config: The global configuration object. Defaults to None, leading to initialization
@@ -156,6 +158,7 @@ class HippoRAG:
         self.rerank_filter = DSPyFilter(self)
 
         self.ready_to_retrieve = False
+        self.index_version = 0
 
         self.ppr_time = 0
         self.rerank_time = 0
@@ -277,6 +280,10 @@ class HippoRAG:
             self.augment_graph()
             self.save_igraph()
 
+            # Retrieval objects (passage keys, embedding matrices) are rebuilt on the next retrieve
+            self.ready_to_retrieve = False
+            self.index_version += 1
+
     def delete(self, docs_to_delete: List[str]):
         """
         Deletes the given documents from all data structures within the HippoRAG class.
@@ -359,6 +366,7 @@ class HippoRAG:
         self.save_igraph()
 
         self.ready_to_retrieve = False
+        self.index_version += 1
 
     def retrieve(self,
                  queries: List[str],
@@ -1,11 +1,10 @@
-import os
 import numpy as np
 from typing import List, Optional
 from copy import deepcopy
 from tqdm import tqdm
-from google import genai
 
 from ..utils.config_utils import BaseConfig
+from ..utils.genai_utils import call_model, get_genai_client
 from ..utils.logging_utils import get_logger
 from .base import BaseEmbeddingModel, EmbeddingConfig
 
@@ -24,10 +23,7 @@ class GeminiEmbeddingModel(BaseEmbeddingModel):
         if "gemini" in self.embedding_model_name and "/" not in self.embedding_model_name:
              self.embedding_model_name = "models/text-embedding-004"
 
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY not found in environment variables.")
-        self.client = genai.Client(api_key=api_key)
+        self.client = get_genai_client()
 
         self._init_embedding_config()
 
@@ -50,9 +46,13 @@ class GeminiEmbeddingModel(BaseEmbeddingModel):
         texts = [t if t != '' else ' ' for t in texts]
         
         try:
-            result = self.client.models.embed_content(
-                model=self.embedding_model_name,
-                contents=texts,
+            result = call_model(
+                self.embedding_model_name,
+                lambda: self.client.models.embed_content(
+                    model=self.embedding_model_name,
+                    contents=texts,
+                ),
+                text="".join(texts),
             )
             # result.embeddings is a list of ContentEmbedding objects
             embeddings = [e.values for e in result.embeddings]
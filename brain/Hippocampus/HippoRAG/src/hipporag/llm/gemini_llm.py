@@ -1,10 +1,9 @@
-import os
-from google import genai
 from google.genai import types
 from typing import List, Tuple
 from copy import deepcopy
 
 from .base import BaseLLM, LLMConfig
+from ..utils.genai_utils import call_model, get_genai_client
 from ..utils.llm_utils import TextChatMessage
 from ..utils.logging_utils import get_logger
 
@@ -16,11 +15,7 @@ class GeminiLLM(BaseLLM):
     def __init__(self, global_config, **kwargs) -> None:
         super().__init__(global_config)
         self.llm_name = global_config.llm_name
-        
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY not found in environment variables.")
-        self.client = genai.Client(api_key=api_key)
+        self.client = get_genai_client()
         
         self._init_llm_config()
 
@@ -54,10 +49,14 @@ class GeminiLLM(BaseLLM):
         )
 
         try:
-            response = self.client.models.generate_content(
-                model=self.llm_name,
-                contents=prompt,
-                config=config,
+            response = call_model(
+                self.llm_name,
+                lambda: self.client.models.generate_content(
+                    model=self.llm_name,
+                    contents=prompt,
+                    config=config,
+                ),
+                text=prompt,
             )
             
             response_message = response.text
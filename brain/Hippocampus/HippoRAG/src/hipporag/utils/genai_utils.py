@@ -0,0 +1,33 @@
+import os
+from typing import Callable, TypeVar
+
+from google import genai
+
+T = TypeVar("T")
+
+# An embedding application can register an object exposing `.client` (a genai.Client),
+# `.call(model, fn, estimated_tokens)` (runs `fn` under that model's rate limit, concurrency
+# cap and retry policy) and `.estimate_tokens(text)`. Gemini LLM and embedding models then
+# share its connections, quota and token estimate instead of creating their own client.
+_provider = None
+
+
+def set_client_provider(provider) -> None:
+    global _provider
+    _provider = provider
+
+
+def get_genai_client() -> genai.Client:
+    if _provider is not None:
+        return _provider.client
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise ValueError("GEMINI_API_KEY not found in environment variables.")
+    return genai.Client(api_key=api_key)
+
+
+def call_model(model: str, fn: Callable[[], T], text: str = "") -> T:
+    """Run `fn` through the provider, reserving quota for `text` (the prompt or the texts to embed)."""
+    if _provider is not None:
+        return _provider.call(model, fn, estimated_tokens=_provider.estimate_tokens(text))
+    return fn()
@@ -0,0 +1,193 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+from typing import List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+from brain.utils import env_path, state_path
+
+DEFAULT_SIGNATURE_PATH = state_path("index_queue", "signatures.sqlite")
+
+_WORD_RE = re.compile(r"\w+")
+_SOURCE_RE = re.compile(r"^\[Source: (.*) \| (.*)\]\n")
+# Query parameters that only track where a click came from
+_TRACKING_PARAMS = re.compile(r"^(utm_\w+|fbclid|gclid|mc_cid|mc_eid|ref|ref_src)$")
+SIMHASH_BITS = 64
+
+
+def normalize_url(url: str) -> str:
+    """Drop the scheme, 'www.', fragments, tracking parameters and trailing slashes; lowercase the host."""
+    url = (url or "").strip()
+    if not url:
+        return ""
+    parts = urlsplit(url)
+    host = parts.netloc.lower().removeprefix("www.")
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query) if not _TRACKING_PARAMS.match(k)))
+    return host + parts.path.rstrip("/") + (f"?{query}" if query else "")
+
+
+def _words(text: str) -> List[str]:
+    return _WORD_RE.findall(text.lower())
+
+
+def content_hash(text: str) -> str:
+    """Hash of the text with case and whitespace normalised away."""
+    return hashlib.sha1(" ".join(_words(text)).encode("utf-8")).hexdigest()
+
+
+def simhash(text: str, shingle: int = 3) -> int:
+    """64-bit SimHash over word shingles; near-identical texts differ in only a few bits."""
+    words = _words(text)
+    shingles = [" ".join(words[i:i + shingle]) for i in range(max(1, len(words) - shingle + 1))]
+    weights = [0] * SIMHASH_BITS
+    for item in shingles:
+        h = int.from_bytes(hashlib.blake2b(item.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if h >> bit & 1 else -1
+    return sum(1 << bit for bit in range(SIMHASH_BITS) if weights[bit] > 0)
+
+
+def bands(signature: int, count: int) -> List[int]:
+    """Split a SimHash into `count` bands (the last one takes the leftover bits).
+
+    Two hashes within `count - 1` bits of each other agree on at least one whole band, so
+    `count = max_distance + 1` bands find every near-duplicate.
+    """
+    width = SIMHASH_BITS // count
+    return [signature >> (i * width) & ((1 << (width if i < count - 1 else SIMHASH_BITS - i * width)) - 1)
+            for i in range(count)]
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin((a ^ b) & (1 << SIMHASH_BITS) - 1).count("1")
+
+
+def _to_signed(value: int) -> int:
+    # SQLite integers are signed 64-bit
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+class SignatureIndex:
+    """Persistent record of what has already gone into HippoRAG, to skip re-ingesting it.
+
+    A search result is a duplicate when its normalized URL or its normalized-content hash
+    has been seen, or when its SimHash is within `max_distance` bits of a stored one (the
+    same article under a different snippet window). Near-duplicate lookups only compare
+    against stored hashes sharing one of `max_distance + 1` bands, so they stay cheap as the
+    index grows; the band rows are rebuilt when `max_distance` changes.
+    """
+
+    def __init__(self, path: str = DEFAULT_SIGNATURE_PATH, max_distance: int = 3):
+        self.path = path
+        self.max_distance = max_distance
+        self.band_count = max_distance + 1
+        self.skipped = {"url": 0, "hash": 0, "near": 0}
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS signatures (
+                content_hash TEXT PRIMARY KEY,
+                url TEXT,
+                simhash INTEGER
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS signatures_url ON signatures (url)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS bands (band INTEGER, value INTEGER, content_hash TEXT)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS bands_value ON bands (band, value)")
+        # user_version records the band count the rows were built with
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] != self.band_count:
+            self._conn.execute("DELETE FROM bands")
+            rows = self._conn.execute("SELECT content_hash, simhash FROM signatures").fetchall()
+            self._conn.executemany("INSERT INTO bands VALUES (?, ?, ?)",
+                                   self._band_rows([(digest, value & (1 << 64) - 1) for digest, value in rows]))
+            self._conn.execute(f"PRAGMA user_version = {self.band_count}")
+        self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM signatures").fetchone()[0]
+
+    @staticmethod
+    def signature(url: str, content: str) -> Tuple[str, str, int]:
+        return normalize_url(url), content_hash(content), simhash(content)
+
+    def _band_rows(self, hashes: list) -> list:
+        return [(i, _to_signed(value), digest) for digest, fingerprint in hashes
+                for i, value in enumerate(bands(fingerprint, self.band_count))]
+
+    def _duplicate_of(self, url: str, digest: str, fingerprint: int) -> Optional[str]:
+        if url and self._conn.execute("SELECT 1 FROM signatures WHERE url = ? LIMIT 1", (url,)).fetchone():
+            return "url"
+        if self._conn.execute("SELECT 1 FROM signatures WHERE content_hash = ?", (digest,)).fetchone():
+            return "hash"
+        where = " OR ".join("(b.band = ? AND b.value = ?)" for _ in range(self.band_count))
+        params = [p for i, value in enumerate(bands(fingerprint, self.band_count)) for p in (i, _to_signed(value))]
+        candidates = self._conn.execute(
+            f"SELECT DISTINCT s.simhash FROM bands b JOIN signatures s ON s.content_hash = b.content_hash WHERE {where}",
+            params,
+        )
+        for (other,) in candidates:
+            if hamming_distance(other, fingerprint) <= self.max_distance:
+                return "near"
+        return None
+
+    def _duplicate_in(self, signatures: list, url: str, digest: str, fingerprint: int) -> Optional[str]:
+        for other_url, other_digest, other_fingerprint in signatures:
+            if url and url == other_url:
+                return "url"
+            if digest == other_digest:
+                return "hash"
+            if hamming_distance(other_fingerprint, fingerprint) <= self.max_distance:
+                return "near"
+        return None
+
+    def filter(self, search_results: list) -> Tuple[list, list]:
+        """Split results into (new ones, their signatures); duplicates within the batch count too."""
+        fresh, signatures = [], []
+        with self._lock:
+            for result in search_results:
+                signature = self.signature(result.get("url", ""), result.get("content", ""))
+                reason = self._duplicate_of(*signature) or self._duplicate_in(signatures, *signature)
+                if reason:
+                    self.skipped[reason] += 1
+                    continue
+                fresh.append(result)
+                signatures.append(signature)
+        return fresh, signatures
+
+    def add(self, signatures: list):
+        """Record signatures once their documents are on their way into HippoRAG."""
+        with self._lock:
+            new = {digest: (url, digest, fingerprint) for url, digest, fingerprint in signatures
+                   if not self._conn.execute("SELECT 1 FROM signatures WHERE content_hash = ?", (digest,)).fetchone()}
+            new = list(new.values())
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO signatures (content_hash, url, simhash) VALUES (?, ?, ?)",
+                [(digest, url, _to_signed(fingerprint)) for url, digest, fingerprint in new],
+            )
+            self._conn.executemany("INSERT INTO bands VALUES (?, ?, ?)",
+                                   self._band_rows([(digest, fingerprint) for _, digest, fingerprint in new]))
+            self._conn.commit()
+
+    def backfill(self, docs: List[str]) -> int:
+        """Seed an empty index from documents HippoRAG already holds ('[Source: title | url]' prefixed)."""
+        signatures = []
+        for doc in docs:
+            match = _SOURCE_RE.match(doc)
+            url, content = (match.group(2), doc[match.end():]) if match else ("", doc)
+            signatures.append(self.signature(url, content))
+        self.add(signatures)
+        return len(signatures)
+
+    @classmethod
+    def from_env(cls) -> Optional["SignatureIndex"]:
+        """On by default; BRAIN_INGEST_DEDUP=0 turns it off (or set it to a file path)."""
+        path = env_path("BRAIN_INGEST_DEDUP", DEFAULT_SIGNATURE_PATH)
+        if path is None:
+            return None
+        return cls(
+            path,
+            max_distance=int(os.getenv("BRAIN_INGEST_DEDUP_DISTANCE", "3")),
+        )
@@ -0,0 +1,191 @@
+import atexit
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, List, Optional
+from brain.utils import env_path, state_path
+
+DEFAULT_QUEUE_PATH = state_path("index_queue", "pending.sqlite")
+
+
+class IndexQueue:
+    """Durable write-behind queue that batches documents into HippoRAG `index()` calls.
+
+    Flows `enqueue` documents (a single SQLite insert) and return straight away; a daemon
+    worker indexes them once `batch_size` are pending or the oldest has waited `max_wait`
+    seconds, so one NER/OpenIE + embedding + graph save pass covers many queries. Rows are
+    deleted only after `index_fn` succeeds, so a crash or a failed batch leaves them on disk
+    for the next attempt (or the next process). A document that has been in `max_attempts`
+    failed batches is retried on its own, and if it fails alone too it moves to the `failed`
+    table, so one bad document can't block the queue. Beyond `max_pending` documents, new ones
+    are dropped and counted rather than letting the backlog grow without bound. `close` (also
+    run at interpreter exit) starts batches for up to `flush_timeout` and always lets the batch
+    in progress finish, so the graph files are never left half-written.
+    """
+
+    def __init__(self, index_fn: Callable[[List[str]], None], path: str = DEFAULT_QUEUE_PATH,
+                 batch_size: int = 32, max_wait: float = 5.0, max_pending: int = 1000,
+                 flush_timeout: float = 60.0, retry_delay: float = 30.0, max_attempts: int = 3):
+        self.index_fn = index_fn
+        self.path = path
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.max_pending = max_pending
+        self.flush_timeout = flush_timeout
+        self.retry_delay = retry_delay
+        self.max_attempts = max_attempts
+        self.enqueued = 0
+        self.indexed = 0
+        self.dropped = 0
+        self.batches = 0
+        self.failures = 0
+        self.dead_lettered = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closing = False
+        self._stop_at = None
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS pending (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                doc TEXT,
+                enqueued_at REAL,
+                attempts INTEGER DEFAULT 0
+            )
+        """)
+        if "attempts" not in [row[1] for row in self._conn.execute("PRAGMA table_info(pending)")]:
+            # Queue files written before attempts were tracked
+            self._conn.execute("ALTER TABLE pending ADD COLUMN attempts INTEGER DEFAULT 0")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS failed (
+                id INTEGER PRIMARY KEY,
+                doc TEXT,
+                enqueued_at REAL,
+                failed_at REAL,
+                error TEXT
+            )
+        """)
+        self._conn.commit()
+        self.pending = self._conn.execute("SELECT COUNT(*) FROM pending").fetchone()[0]
+        if self.pending:
+            print(f"[IndexQueue] Resuming with {self.pending} documents left from a previous run.")
+
+        self._worker = threading.Thread(target=self._run, name="index-queue", daemon=True)
+        self._worker.start()
+        atexit.register(self.close)
+
+    def enqueue(self, docs: List[str]) -> int:
+        """Queue documents for indexing; returns how many were accepted (the rest hit `max_pending`)."""
+        with self._lock:
+            if self._closing:
+                return 0
+            accepted = docs[:max(0, self.max_pending - self.pending)]
+            now = time.time()
+            self._conn.executemany("INSERT INTO pending (doc, enqueued_at) VALUES (?, ?)", [(doc, now) for doc in accepted])
+            self._conn.commit()
+            self.pending += len(accepted)
+            self.enqueued += len(accepted)
+            self.dropped += len(docs) - len(accepted)
+            if self.pending >= self.batch_size:
+                self._wake.set()
+        if len(accepted) < len(docs):
+            print(f"[IndexQueue] Backlog full ({self.max_pending} pending), dropped {len(docs) - len(accepted)} documents.")
+        return len(accepted)
+
+    def _next_batch(self) -> List[tuple]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, doc, enqueued_at, attempts FROM pending ORDER BY id LIMIT ?", (self.batch_size,)
+            ).fetchall()
+        if rows and rows[0][3] >= self.max_attempts:
+            # Failed in too many batches: try it alone to find out whether it is the bad one
+            return rows[:1]
+        if not rows or self._closing or len(rows) >= self.batch_size:
+            return rows
+        # A partial batch waits until its oldest document has waited max_wait
+        return rows if time.time() - rows[0][2] >= self.max_wait else []
+
+    def _failed(self, rows: List[tuple], error: Exception):
+        self.failures += 1
+        with self._lock:
+            self._conn.executemany("UPDATE pending SET attempts = attempts + 1 WHERE id = ?", [(row[0],) for row in rows])
+            if len(rows) == 1 and rows[0][3] + 1 >= self.max_attempts:
+                row = rows[0]
+                self._conn.execute("INSERT OR REPLACE INTO failed VALUES (?, ?, ?, ?, ?)",
+                                   (row[0], row[1], row[2], time.time(), str(error)))
+                self._conn.execute("DELETE FROM pending WHERE id = ?", (row[0],))
+                self.pending -= 1
+                self.dead_lettered += 1
+                print(f"[IndexQueue] Document {row[0]} failed {row[3] + 1} times, moved to the 'failed' table: {error}")
+            else:
+                print(f"[IndexQueue] Failed to index {len(rows)} documents, keeping them queued: {error}")
+            self._conn.commit()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.max_wait)
+            self._wake.clear()
+            if self._stop_at is not None and time.monotonic() >= self._stop_at:
+                # Closing and out of time: leave the rest for the next start rather than begin another batch
+                return
+            rows = self._next_batch()
+            if not rows:
+                if self._closing:
+                    return
+                continue
+            try:
+                self.index_fn([row[1] for row in rows])
+            except Exception as e:
+                self._failed(rows, e)
+                if self._closing:
+                    return
+                # Back off, but still wake up for close()
+                self._wake.wait(self.retry_delay)
+                continue
+            with self._lock:
+                self._conn.executemany("DELETE FROM pending WHERE id = ?", [(row[0],) for row in rows])
+                self._conn.commit()
+                self.pending -= len(rows)
+                self.indexed += len(rows)
+                self.batches += 1
+            # More may already be waiting; go again without sleeping
+            self._wake.set()
+
+    def close(self, timeout: Optional[float] = None):
+        """Stop accepting documents and drain the queue; leftovers stay on disk.
+
+        New batches start for up to `flush_timeout` seconds, but a batch already being indexed
+        is always waited for: killing it would leave HippoRAG's files half-written.
+        """
+        with self._lock:
+            if self._closing:
+                return
+            self._stop_at = time.monotonic() + (self.flush_timeout if timeout is None else timeout)
+            self._closing = True
+        self._wake.set()
+        self._worker.join()
+        if self.pending:
+            print(f"[IndexQueue] {self.pending} documents still pending; they will be indexed on the next start.")
+
+    def stats(self) -> dict:
+        return {"pending": self.pending, "enqueued": self.enqueued, "indexed": self.indexed,
+                "batches": self.batches, "dropped": self.dropped, "failures": self.failures,
+                "dead_lettered": self.dead_lettered}
+
+    @classmethod
+    def from_env(cls, index_fn: Callable[[List[str]], None]) -> Optional["IndexQueue"]:
+        """Write-behind is on by default; BRAIN_INDEX_QUEUE=0 indexes inline instead (or set it to a file path)."""
+        path = env_path("BRAIN_INDEX_QUEUE", DEFAULT_QUEUE_PATH)
+        if path is None:
+            return None
+        return cls(
+            index_fn,
+            path=path,
+            batch_size=int(os.getenv("BRAIN_INDEX_BATCH_SIZE", "32")),
+            max_wait=float(os.getenv("BRAIN_INDEX_BATCH_WAIT", "5")),
+            max_pending=int(os.getenv("BRAIN_INDEX_QUEUE_MAX", "1000")),
+            flush_timeout=float(os.getenv("BRAIN_INDEX_FLUSH_TIMEOUT", "60")),
+            max_attempts=int(os.getenv("BRAIN_INDEX_MAX_ATTEMPTS", "3")),
+        )
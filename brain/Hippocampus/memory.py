@@ -1,7 +1,17 @@
 import sys
 import os
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+from brain.client_pool import get_pool
 from brain.core import BrainRegion
-from brain.schemas import BrainContext
+from brain.fusion import reciprocal_rank_fusion
+from brain.schemas import BrainContext, MemoryRecall
+from brain.tracing import add_child_span, child_span
+from brain.Hippocampus.dedup import SignatureIndex
+from brain.Hippocampus.index_queue import IndexQueue
+from brain.Hippocampus.retrieval_cache import RetrievalCache
 
 # Add HippoRAG src to path
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -9,33 +19,119 @@ hipporag_src_path = os.path.join(current_dir, "HippoRAG", "src")
 if hipporag_src_path not in sys.path:
     sys.path.append(hipporag_src_path)
 
-try:
-    from hipporag import HippoRAG
-except ImportError as e:
-    print(f"Warning: Failed to import HippoRAG: {e}")
-    HippoRAG = None
+
+def _load_hipporag():
+    """Import the HippoRAG stack (torch, transformers, igraph...) and load the stores from disk.
+
+    Slow, so it runs on a background thread started by Hippocampus.__init__. Returns None
+    when HippoRAG is unavailable.
+    """
+    try:
+        from hipporag import HippoRAG
+        from hipporag.utils.genai_utils import set_client_provider
+    except ImportError as e:
+        print(f"Warning: Failed to import HippoRAG: {e}")
+        return None
+
+    try:
+        # Initialize HippoRAG with Gemini
+        # We use a memory_storage subfolder for keeping indices
+        save_dir = os.path.join(current_dir, "memory_storage")
+        # HippoRAG's Gemini LLM and embedding model share the brain's client and caps
+        set_client_provider(get_pool())
+        # Using Gemini 1.5 Flash as it's fast and effective
+        return HippoRAG(
+            save_dir=save_dir,
+            llm_model_name="gemini-1.5-flash", 
+            embedding_model_name="gemini-embedding"
+        )
+    except Exception as e:
+        print(f"Error initializing HippoRAG: {e}")
+        return None
+
+# Deadline thresholds (seconds of budget left): below these, retrieve a single memory / none at all
+FULL_RECALL_MIN_BUDGET = 5.0
+RECALL_MIN_BUDGET = 2.0
+# Memories kept after fusing the per-query results, and how deep each query's own ranking goes
+RECALL_K = int(os.getenv("BRAIN_RECALL_K", "4"))
+RECALL_PER_QUERY_K = int(os.getenv("BRAIN_RECALL_PER_QUERY_K", "5"))
+# The original query plus at most this many plan steps are retrieved in one batch
+RECALL_MAX_STEPS = int(os.getenv("BRAIN_RECALL_MAX_STEPS", "5"))
+# How long a query waits for HippoRAG to finish loading before going on without memories
+READY_TIMEOUT = float(os.getenv("BRAIN_HIPPO_READY_TIMEOUT", "5"))
+# How long a retrieval waits for an index batch holding HippoRAG before going on without memories
+LOCK_TIMEOUT = float(os.getenv("BRAIN_HIPPO_LOCK_TIMEOUT", "2"))
+# Seconds the retrieval must have left to start HippoRAG's rerank LLM call
+RERANK_MIN_BUDGET = 2.0
+
+
+class MemoryBusy(RuntimeError):
+    """HippoRAG stayed locked by an indexing call for longer than the retrieval could wait."""
 
 class Hippocampus(BrainRegion):
     def __init__(self, name: str, llm):
         super().__init__(name, llm)
         self.hipporag = None
-        if HippoRAG:
+        # HippoRAG is not thread-safe; retrieval and indexing run in worker threads
+        self._lock = threading.Lock()
+        # Loading happens in the background so constructing the region (and fast-flow queries) never waits on it.
+        # Marked running up front so a timed-out waiter can't cancel it.
+        self.ready = Future()
+        self.ready.set_running_or_notify_cancel()
+        # Signatures of everything already ingested, so repeated pages skip OpenIE and embedding
+        self.dedup = SignatureIndex.from_env()
+        # Identical retrieve calls (same plan text, k and config) skip embedding, rerank and PPR until the graph changes
+        self.retrieval_cache = RetrievalCache.from_env()
+        # Search results are indexed in batches by a background worker (BRAIN_INDEX_QUEUE=0 to index inline)
+        self.index_queue = IndexQueue.from_env(self._index_batch)
+        # Started last: _load reads the attributes above
+        threading.Thread(target=self._load, name="hipporag-loader", daemon=True).start()
+
+    def _load(self):
+        start = time.perf_counter()
+        try:
+            self.hipporag = _load_hipporag()
+            if self.hipporag and self.dedup is not None and not len(self.dedup):
+                seeded = self.dedup.backfill(self.hipporag.chunk_embedding_store.get_all_texts())
+                if seeded:
+                    print(f"[{self.name}] Seeded the ingest dedup index with {seeded} existing documents.")
+        finally:
+            self.ready.set_result(self.hipporag)
+        if self.hipporag:
+            print(f"[{self.name}] HippoRAG ready in {time.perf_counter() - start:.1f}s.")
+
+    @property
+    def is_ready(self) -> bool:
+        return self.ready.done()
+
+    def wait_until_ready(self, timeout: float | None = None):
+        """Block (worker threads only) until loading finishes; returns the HippoRAG instance or None."""
+        return self.ready.result(timeout)
+
+    async def await_ready(self, timeout: float | None = None) -> bool:
+        """Wait for loading without blocking the event loop; False if it is still loading after `timeout`."""
+        if not self.ready.done():
             try:
-                # Initialize HippoRAG with Gemini
-                # We use a memory_storage subfolder for keeping indices
-                save_dir = os.path.join(current_dir, "memory_storage")
-                # Using Gemini 1.5 Flash as it's fast and effective
-                self.hipporag = HippoRAG(
-                    save_dir=save_dir,
-                    llm_model_name="gemini-1.5-flash", 
-                    embedding_model_name="gemini-embedding"
-                )
-            except Exception as e:
-                print(f"Error initializing HippoRAG: {e}")
+                await asyncio.wait_for(asyncio.wrap_future(self.ready), timeout)
+            except asyncio.TimeoutError:
+                return False
+        return True
 
-    def process(self, context: BrainContext) -> BrainContext:
+    async def process(self, context: BrainContext) -> BrainContext:
         context.add_log(self.name, "Retrieving relevant context/memories...")
-        
+
+        if context.memories is not None:
+            # Already retrieved speculatively (keyed on the raw query) while the router was deciding
+            context.add_log(self.name, f"Using {len(context.memories)} prefetched memories.")
+            context.current_stage = "Contextualized"
+            return context
+
+        # A cold start may still be loading the stores; wait a bounded time rather than stall the query
+        budget = context.stage_timeout(0.5)
+        if not await self.await_ready(READY_TIMEOUT if budget is None else min(READY_TIMEOUT, budget)):
+            context.degrade(self.name, "HippoRAG is still loading, proceeding without memories.")
+            return context
+
         if not self.hipporag:
             context.add_log(self.name, "HippoRAG not initialized, skipping retrieval.")
              # Fallback to simple generation if HippoRAG fails? 
@@ -44,20 +140,34 @@ class Hippocampus(BrainRegion):
              # No, user wants to use HippoRAG.
             return context
 
-        query = "\n".join(context.plan) if context.plan else context.original_query
-        
+        if context.short_on_time(RECALL_MIN_BUDGET):
+            context.degrade(self.name, f"{context.remaining():.1f}s left, skipping memory retrieval.")
+            return context
+
+        num_to_retrieve = RECALL_K
+        # The query itself plus each plan step, so every step gets memories of its own
+        queries = [context.original_query, *(context.plan or [])[:RECALL_MAX_STEPS]]
+        if context.short_on_time(FULL_RECALL_MIN_BUDGET):
+            num_to_retrieve, queries = 1, queries[:1]
+            context.degrade(self.name, f"{context.remaining():.1f}s left, retrieving a single memory for the query alone.")
+
         try:
-            # self.hipporag.retrieve returns a list of QuerySolution
-            # We treat the query as a list of 1 string
-            results = self.hipporag.retrieve(queries=[query], num_to_retrieve=2)
-            
-            memories = []
-            if results and len(results) > 0:
-                memories = results[0].docs
-            
-            context.memories = memories
-            context.add_log(self.name, f"Context Retrieved:\n{memories}")
-            
+            # Retrieval may use at most half of what is left, and waits on an index batch for no longer than that
+            timeout = context.stage_timeout(0.5)
+            lock_timeout = LOCK_TIMEOUT if timeout is None else min(LOCK_TIMEOUT, timeout)
+            deadline = None if timeout is None else time.perf_counter() + timeout
+            recalled = await asyncio.wait_for(self.recall_scored(queries, num_to_retrieve, lock_timeout, deadline), timeout)
+            recalled.apply(context)
+            if not recalled.reranked:
+                context.degrade(self.name, "Too little time left for the rerank call, memories ranked by dense similarity only.")
+            context.add_log(self.name, f"Context Retrieved:\n{recalled.docs}")
+            if recalled.confidence is not None:
+                context.add_log(self.name, f"Recall confidence {recalled.confidence:.2f} (scores {[round(s, 3) for s in recalled.scores]}).")
+
+        except MemoryBusy:
+            context.degrade(self.name, "HippoRAG is busy indexing, proceeding without memories.")
+        except asyncio.TimeoutError:
+            context.degrade(self.name, "Memory retrieval timed out, proceeding without memories.")
         except Exception as e:
             context.add_log(self.name, f"Error during retrieval: {e}")
             # Fallback to LLM simulation if RAG fails (optional, but good for robustness)
@@ -67,36 +177,165 @@ class Hippocampus(BrainRegion):
         context.current_stage = "Contextualized"
         return context
         
+    async def recall(self, query: str, num_to_retrieve: int = RECALL_K) -> list:
+        """Retrieve memories for a single query string without blocking the event loop."""
+        return (await self.recall_scored(query, num_to_retrieve)).docs
+
+    async def recall_scored(self, queries: str | list, num_to_retrieve: int = RECALL_K,
+                            lock_timeout: float = LOCK_TIMEOUT, deadline: float | None = None) -> MemoryRecall:
+        """Like `recall`, but keeps the scores and the recall confidence.
+
+        Given several queries (the query first, then plan steps), they are embedded in one batch;
+        the query gets the full rerank + PPR retrieval and the steps dense passage retrieval. The
+        rankings are fused with reciprocal rank fusion, so the scores are then RRF scores.
+        Raises MemoryBusy if an index batch holds HippoRAG for more than `lock_timeout` seconds.
+        Cancelling the await can't stop the worker thread, so `deadline` (a perf_counter() value)
+        is checked inside it: past it the thread returns without retrieving, and close to it the
+        rerank LLM call is skipped.
+        """
+        if not await self.await_ready(READY_TIMEOUT) or not self.hipporag:
+            return MemoryRecall()
+        queries = list(dict.fromkeys([queries] if isinstance(queries, str) else queries))
+        if self.retrieval_cache is not None:
+            key = self.retrieval_cache.key(queries, num_to_retrieve, self.hipporag.global_config)
+            cached = self.retrieval_cache.get(key, self.hipporag.index_version)
+            if cached is not None:
+                return cached
+        # Retrieval embeds, reranks and runs PPR synchronously, so keep it off the event loop
+        return await asyncio.to_thread(self._retrieve, queries, num_to_retrieve, lock_timeout, deadline)
+
+    def _confidence(self, query: str, docs: list) -> float | None:
+        """Best cosine similarity between the query and a retrieved passage.
+
+        HippoRAG's doc_scores are min-max normalised (DPR) or PageRank mass (PPR), so the top one
+        says nothing about how good the match is; raw similarity does. Both embeddings are already
+        cached by the retrieve call, so this costs no API request.
+        """
+        import numpy as np
+        query_embedding = self.hipporag.query_to_embedding["passage"].get(query)
+        store = self.hipporag.chunk_embedding_store
+        if query_embedding is None or not docs:
+            return None
+        query_embedding = np.ravel(query_embedding)
+        best = None
+        for doc in docs:
+            if doc not in store.text_to_hash_id:
+                continue
+            passage = store.get_embedding(store.get_hash_id(doc))
+            similarity = float(np.dot(query_embedding, passage) / (np.linalg.norm(query_embedding) * np.linalg.norm(passage) or 1.0))
+            best = similarity if best is None else max(best, similarity)
+        return best
+
+    def _retrieve(self, queries: list, num_to_retrieve: int = RECALL_K, lock_timeout: float = LOCK_TIMEOUT,
+                  deadline: float | None = None) -> MemoryRecall:
+        # A background index() can hold the lock for a long time; don't let the worker thread wait it out
+        if not self._lock.acquire(timeout=lock_timeout):
+            raise MemoryBusy(f"HippoRAG still locked by indexing after {lock_timeout:.1f}s")
+        try:
+            return self._retrieve_locked(queries, num_to_retrieve, deadline)
+        finally:
+            self._lock.release()
+
+    def _retrieve_locked(self, queries: list, num_to_retrieve: int, deadline: float | None = None) -> MemoryRecall:
+        depth = num_to_retrieve if len(queries) == 1 else max(num_to_retrieve, RECALL_PER_QUERY_K)
+        with child_span("hipporag.retrieve", region=self.name) as span:
+            if deadline is not None and time.perf_counter() >= deadline:
+                # The caller stopped waiting while this thread queued for the lock; don't hold it for nothing
+                span.attributes["abandoned"] = True
+                return MemoryRecall()
+            # Read under the lock, so the version matches the graph this retrieve runs against
+            version = self.hipporag.index_version
+            ppr_before, rerank_before = self.hipporag.ppr_time, self.hipporag.rerank_time
+            if not self.hipporag.ready_to_retrieve:
+                # Resets the query embedding cache, so it has to run before the batch is embedded
+                self.hipporag.prepare_retrieval_objects()
+            self.hipporag.get_query_embeddings(queries)
+            # Rerank (an LLM call) and PPR run once per query, serially; only the query itself gets them,
+            # and only with time left for the call. Otherwise dense passage scores rank everything.
+            reranked = deadline is None or deadline - time.perf_counter() >= RERANK_MIN_BUDGET
+            if reranked:
+                results = self.hipporag.retrieve(queries=queries[:1], num_to_retrieve=depth)
+                end = time.time()
+                results += self.hipporag.retrieve_dpr(queries=queries[1:], num_to_retrieve=depth) if queries[1:] else []
+            else:
+                end = time.time()
+                results = self.hipporag.retrieve_dpr(queries=queries, num_to_retrieve=depth)
+            span.attributes["reranked"] = reranked
+
+            # HippoRAG only keeps cumulative timers; rerank runs right before PPR, so lay them out back to back
+            if reranked:
+                ppr = self.hipporag.ppr_time - ppr_before
+                rerank = self.hipporag.rerank_time - rerank_before
+                add_child_span("hipporag.rerank", end - ppr - rerank, end - ppr, region=self.name, attributes={"timer": "rerank_time"})
+                add_child_span("hipporag.ppr", end - ppr, end, region=self.name, attributes={"timer": "ppr_time"})
+            span.attributes["num_queries"] = len(queries)
+            if not results:
+                return MemoryRecall()
+            # self.hipporag.retrieve returns one QuerySolution per query
+            if len(results) == 1:
+                docs = results[0].docs
+                scores = [float(score) for score in (results[0].doc_scores if results[0].doc_scores is not None else [])]
+            else:
+                fused = reciprocal_rank_fusion([solution.docs for solution in results])[:num_to_retrieve]
+                docs, scores = [doc for doc, _ in fused], [round(score, 5) for _, score in fused]
+            # Confidence is judged against the query itself, whose embedding is cached as the first of the batch
+            confidence = self._confidence(queries[0], docs)
+            span.attributes.update(num_results=len(docs), confidence=confidence)
+            recall = MemoryRecall(docs=docs, scores=scores, confidence=confidence, reranked=reranked)
+            # A rushed ranking isn't what a query with time to spare should get back
+            if self.retrieval_cache is not None and reranked:
+                key = self.retrieval_cache.key(queries, num_to_retrieve, self.hipporag.global_config)
+                self.retrieval_cache.put(key, version, recall)
+            return recall
+
     def add_memory(self, content: str):
         """Allows adding new memories (documents) to the RAG store."""
-        if self.hipporag:
+        if self.wait_until_ready():
             # Index expects a list of docs
-            self.hipporag.index(docs=[content])
+            with self._lock:
+                self.hipporag.index(docs=[content])
             return True
         return False
 
+    @staticmethod
+    def _search_result_docs(search_results: list) -> list:
+        """One document per search result, prefixed with its title and source URL for traceability."""
+        return [f"[Source: {result.get('title', 'Untitled')} | {result.get('url', '')}]\n{result['content']}"
+                for result in search_results]
+
+    def _new_results(self, search_results: list) -> tuple:
+        """Results with content that hasn't been ingested yet (by URL, content hash or near-duplicate).
+
+        Returns (results, signatures); signatures are empty when dedup is disabled.
+        """
+        results = [result for result in search_results or [] if result.get("content", "").strip()]
+        if self.dedup is None:
+            return results, []
+        return self.dedup.filter(results)
+
+    def _remember(self, signatures: list):
+        if self.dedup is not None:
+            self.dedup.add(signatures)
+
     def index_search_results(self, search_results: list):
         """
         Index Tavily search results into HippoRAG for long-term memory.
         
         Each search result's content becomes a document in the knowledge graph,
-        prefixed with its title and source URL for traceability.
+        prefixed with its title and source URL for traceability. Results already
+        ingested are skipped. This indexes inline; flows use `queue_search_results`
+        so indexing stays off the query path.
         """
-        if not self.hipporag or not search_results:
+        if not search_results or not self.wait_until_ready():
             return False
 
-        docs = []
-        for result in search_results:
-            title = result.get("title", "Untitled")
-            url = result.get("url", "")
-            content = result.get("content", "")
-            if content.strip():
-                doc = f"[Source: {title} | {url}]\n{content}"
-                docs.append(doc)
-
+        fresh, signatures = self._new_results(search_results)
+        docs = self._search_result_docs(fresh)
         if docs:
             try:
-                self.hipporag.index(docs=docs)
+                with self._lock:
+                    self.hipporag.index(docs=docs)
+                self._remember(signatures)
                 print(f"[Hippocampus] Indexed {len(docs)} search results into HippoRAG.")
                 return True
             except Exception as e:
@@ -104,3 +343,31 @@ class Hippocampus(BrainRegion):
 
         return False
 
+    def queue_search_results(self, search_results: list) -> tuple:
+        """Hand new search results to the write-behind queue (or index inline when it is disabled).
+
+        Returns (documents accepted, results skipped as duplicates or empty).
+        """
+        fresh, signatures = self._new_results(search_results)
+        skipped = len(search_results or []) - len(fresh)
+        if not fresh:
+            return 0, skipped
+        if self.index_queue is None:
+            return (len(fresh) if self.index_search_results(fresh) else 0), skipped
+        accepted = self.index_queue.enqueue(self._search_result_docs(fresh))
+        # Documents dropped by backpressure aren't remembered, so they can come again
+        self._remember(signatures[:accepted])
+        return accepted, skipped
+
+    def _index_batch(self, docs: list):
+        """Index worker callback: one HippoRAG `index()` call for a whole batch; raising keeps the batch queued."""
+        if not self.wait_until_ready():
+            raise RuntimeError("HippoRAG is not available")
+        with self._lock:
+            self.hipporag.index(docs=docs)
+        print(f"[{self.name}] Indexed a batch of {len(docs)} documents into HippoRAG.")
+
+    def close(self):
+        """Flush the indexing queue before shutdown."""
+        if self.index_queue is not None:
+            self.index_queue.close()
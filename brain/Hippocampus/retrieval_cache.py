@@ -0,0 +1,64 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional
+from brain.schemas import MemoryRecall
+
+# HippoRAG settings that change what retrieve() returns for the same queries
+CONFIG_FIELDS = ("retrieval_top_k", "linking_top_k", "damping", "passage_node_weight", "embedding_model_name", "llm_name")
+
+
+class RetrievalCache:
+    """In-memory LRU of HippoRAG retrieval results, invalidated by the index version.
+
+    Keys are (queries, k, retrieval config). Every entry remembers the `index_version` it was
+    computed at, and a lookup at any other version is a miss (the whole cache is dropped the
+    first time a new version is seen), so nothing retrieved before an index() or delete() is
+    served after it. Hits are a dict lookup and a copy, with no embedding, rerank or PPR.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[Hashable, MemoryRecall]" = OrderedDict()
+        self.version: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(queries: list, num_to_retrieve: int, global_config) -> tuple:
+        config = tuple(getattr(global_config, field, None) for field in CONFIG_FIELDS)
+        return tuple(queries), num_to_retrieve, config
+
+    def get(self, key: tuple, version: int) -> Optional[MemoryRecall]:
+        with self._lock:
+            if version != self.version:
+                self.entries.clear()
+                self.version = version
+            recall = self.entries.get(key)
+            if recall is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+        # Callers put the lists on a BrainContext; don't let them mutate the cached copy
+        return recall.model_copy(deep=True)
+
+    def put(self, key: tuple, version: int, recall: MemoryRecall):
+        with self._lock:
+            if version != self.version:
+                # Computed against an older (or newer) graph than the cache holds
+                if self.version is not None and version < self.version:
+                    return
+                self.entries.clear()
+                self.version = version
+            self.entries[key] = recall.model_copy(deep=True)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    @classmethod
+    def from_env(cls) -> Optional["RetrievalCache"]:
+        """On by default; BRAIN_RETRIEVAL_CACHE_SIZE=0 turns it off."""
+        size = int(os.getenv("BRAIN_RETRIEVAL_CACHE_SIZE", "256"))
+        return cls(size) if size > 0 else None
@@ -1,5 +1,6 @@
 import sys
 import os
+import asyncio
 
 # Adust path to include project root
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
@@ -15,7 +16,8 @@ def test_hippocampus():
     
     hippo = Hippocampus("Hippocampus", MockLLM())
     
-    if not hippo.hipporag:
+    # HippoRAG loads in a background thread
+    if not hippo.wait_until_ready():
         print("Failed to initialize HippoRAG inside Hippocampus.")
         return
 
@@ -30,7 +32,7 @@ def test_hippocampus():
     ctx = BrainContext(original_query="What is Abhi working on?", plan=["Retrieve info about Abhi's project"])
     
     # Process
-    ctx = hippo.process(ctx)
+    ctx = asyncio.run(hippo.process(ctx))
     
     print("Resulting Context Memories:")
     for mem in ctx.memories:
@@ -1,19 +1,85 @@
+import asyncio
+import os
+import re
 from brain.core import BrainRegion
-from brain.schemas import BrainContext
-from brain.Left_Hemisphere.tavily_search import TavilySearchClient
+from brain.rate_limit import LLMCallError
+from brain.prompt_packer import PromptPacker, format_bullets
+from brain.rate_limit import estimate_tokens
+from brain.schemas import BrainContext, CascadeDraft
+from brain.tracing import child_span
+from brain.utils import env_flag
+from brain.Left_Hemisphere.tavily_search import MAX_QUERY_CHARS, TavilySearchClient, merge_results
 
+# Deadline thresholds (seconds of budget left): below these, skip the web search / deep reasoning
+SEARCH_MIN_BUDGET = 6.0
+DEEP_REASONING_MIN_BUDGET = 15.0
+
+# Fan-out mode: one search per plan step (plus the query itself), at most this many at once
+SEARCH_FANOUT = env_flag("BRAIN_SEARCH_FANOUT")
+FANOUT_MAX_QUERIES = int(os.getenv("BRAIN_SEARCH_FANOUT_MAX_QUERIES", "5"))
+FANOUT_CONCURRENCY = int(os.getenv("BRAIN_SEARCH_FANOUT_CONCURRENCY", "4"))
+FANOUT_MAX_RESULTS = int(os.getenv("BRAIN_SEARCH_FANOUT_MAX_RESULTS", "8"))
+
+# Memory-first grounding: recall confidence (best query-memory cosine similarity) at which the
+# web search is skipped entirely, or shrunk to a single small query
+MEMORY_FIRST = env_flag("BRAIN_MEMORY_FIRST")
+MEMORY_SKIP_SEARCH_CONFIDENCE = float(os.getenv("BRAIN_MEMORY_SKIP_SEARCH_CONFIDENCE", "0.85"))
+MEMORY_SHRINK_SEARCH_CONFIDENCE = float(os.getenv("BRAIN_MEMORY_SHRINK_SEARCH_CONFIDENCE", "0.75"))
+SHRUNK_MAX_RESULTS = 2
+
+# Token budget for the reasoning prompt (memories + search results + instructions)
+PROMPT_BUDGET = int(os.getenv("BRAIN_PROMPT_BUDGET_LEFT", "6000"))
+
+_URL_RE = re.compile(r"https?://[^\s)\]>'\"]+")
 
 class LeftHemisphere(BrainRegion):
     def __init__(self, name: str, llm):
         super().__init__(name, llm)
         self.search_client = TavilySearchClient()
+        self.packer = PromptPacker(PROMPT_BUDGET)
+        # Cascade mode: flash/low answers first and only low-confidence or ungrounded answers escalate
+        self.cascade = env_flag("BRAIN_LEFT_CASCADE")
+        self.cascade_threshold = float(os.getenv("BRAIN_CASCADE_CONFIDENCE", "0.8"))
+        self.cascade_attempts = 0
+        self.cascade_escalations = 0
+        self.memory_first = MEMORY_FIRST
+        self.searches_skipped = 0
+        self.searches_shrunk = 0
 
-    def process(self, context: BrainContext) -> BrainContext:
-        context.add_log(self.name, "Processing logic and structure...")
+    async def process(self, context: BrainContext) -> BrainContext:
+        context = await self.search(context)
+        return await self.reason(context)
 
+    async def search(self, context: BrainContext) -> BrainContext:
+        """Step 1 on its own: only needs the plan, so flows can run it alongside memory retrieval."""
         # --- Step 1: Tavily Web Search for Grounding ---
-        search_results = []
-        if self.search_client.is_available:
+        if context.search_results is not None:
+            # Already fetched speculatively while the router was deciding
+            context.add_log(self.name, f"Using {len(context.search_results)} prefetched search results.")
+        elif self.search_client.is_available and context.short_on_time(SEARCH_MIN_BUDGET):
+            context.degrade(self.name, f"{context.remaining():.1f}s left, skipping web search.")
+        elif self.search_client.is_available and self._recall_is_confident(context, MEMORY_SKIP_SEARCH_CONFIDENCE):
+            self.searches_skipped += 1
+            context.add_log(self.name, f"Recall confidence {context.memory_confidence:.2f}, answering from memory without a web search "
+                                       f"({self.searches_skipped} searches skipped, {self.searches_shrunk} shrunk so far).")
+        elif self.search_client.is_available and self._recall_is_confident(context, MEMORY_SHRINK_SEARCH_CONFIDENCE):
+            self.searches_shrunk += 1
+            context.add_log(self.name, f"Recall confidence {context.memory_confidence:.2f}, topping up memory with a small web search "
+                                       f"({self.searches_skipped} searches skipped, {self.searches_shrunk} shrunk so far).")
+            try:
+                context.search_results = await asyncio.wait_for(
+                    self.search_web(context.original_query, max_results=SHRUNK_MAX_RESULTS, context=context),
+                    context.stage_timeout(0.5))
+            except asyncio.TimeoutError:
+                context.degrade(self.name, "Web search timed out, proceeding with memory only.")
+        elif self.search_client.is_available and SEARCH_FANOUT and context.plan:
+            queries = self._fanout_queries(context)
+            context.add_log(self.name, f"Searching the web via Tavily with {len(queries)} queries (one per plan step).")
+            try:
+                context.search_results = await asyncio.wait_for(self._fanout_search(context, queries), context.stage_timeout(0.5))
+            except asyncio.TimeoutError:
+                context.degrade(self.name, "Web search timed out, proceeding without web grounding.")
+        elif self.search_client.is_available:
             search_query = context.original_query
             # If we have a plan, append plan context but respect Tavily's 400-char limit
             if context.plan:
@@ -22,12 +88,23 @@ class LeftHemisphere(BrainRegion):
                 search_query = combined[:400]
 
             context.add_log(self.name, f"Searching the web via Tavily: '{search_query[:80]}...'")
-            search_results = self.search_client.search(search_query, max_results=5)
-            context.search_results = search_results
-            context.add_log(self.name, f"Tavily search returned {len(search_results)} results.")
+            try:
+                # The search may use at most half of what is left; the answer still has to be written
+                search_results = await asyncio.wait_for(self.search_web(search_query, context=context), context.stage_timeout(0.5))
+                context.search_results = search_results
+                context.add_log(self.name, f"Tavily search returned {len(search_results)} results.")
+            except asyncio.TimeoutError:
+                context.degrade(self.name, "Web search timed out, proceeding without web grounding.")
         else:
             context.add_log(self.name, "Tavily not available, proceeding without web grounding.")
 
+        return context
+
+    async def reason(self, context: BrainContext) -> BrainContext:
+        """Steps 2-4: turn plan, memories and search results into grounded facts."""
+        context.add_log(self.name, "Processing logic and structure...")
+        search_results = context.search_results or []
+
         # --- Step 2: Build grounded prompt ---
         system_prompt = (
             "You are the Left Hemisphere, the Engineer. "
@@ -38,26 +115,39 @@ class LeftHemisphere(BrainRegion):
             "Output clear, dry, verifiable facts and logical steps."
         )
 
-        # Format search results for the LLM
-        search_context = ""
-        if search_results:
-            formatted = []
-            for i, r in enumerate(search_results, 1):
-                formatted.append(f"[{i}] {r['title']}\n    URL: {r['url']}\n    {r['content']}")
-            search_context = "\n\n".join(formatted)
+        # Dedupe memories against search results and keep the most relevant within the budget
+        plan = format_bullets(context.plan)
+        packed = self.packer.pack(
+            f"{context.original_query} {' '.join(context.plan or [])}",
+            {"search": [f"{r['title']}\n    URL: {r['url']}\n    {r['content']}" for r in search_results],
+             "memories": context.memories},
+            reserved_tokens=estimate_tokens(system_prompt + context.original_query + plan),
+        )
+        context.add_log(self.name, f"Prompt {packed.summary()}.")
+        search_context = "\n\n".join(f"[{i}] {text}" for i, text in enumerate(packed.sections["search"], 1))
 
         data = (
             f"Query: {context.original_query}\n"
-            f"Plan: {context.plan}\n"
-            f"Memory Context: {context.memories}\n"
+            f"Plan:\n{plan}\n"
+            f"Memory Context:\n{format_bullets(packed.sections['memories'])}\n"
             f"\n--- Web Search Results ---\n{search_context if search_context else 'No search results available.'}"
         )
 
         # --- Step 3: Generate grounded facts ---
-        facts = self.llm.generate(system_prompt, data, temperature=0.0)
+        sink = context.token_sink()
+        facts = await self._cascade(context, system_prompt, data, search_results) if self.cascade else None
+        if facts is not None:
+            if sink:
+                sink(facts)
+        else:
+            llm = self.llm_for(context, DEEP_REASONING_MIN_BUDGET)
+            facts = await llm.agenerate(system_prompt, data, temperature=0.0, on_token=sink, deadline=context.deadline)
         context.logical_facts = [f.strip() for f in facts.split('\n') if f.strip()]
 
-        context.add_log(self.name, f"Logical Structure:\n{facts}")
+        if sink:
+            context.add_log(self.name, f"Logical Structure streamed ({len(context.logical_facts)} lines).")
+        else:
+            context.add_log(self.name, f"Logical Structure:\n{facts}")
         context.current_stage = "Analyzed (Logic + Grounded)"
 
         # --- Step 4: Index search results into HippoRAG for long-term memory ---
@@ -66,6 +156,98 @@ class LeftHemisphere(BrainRegion):
 
         return context
 
+    async def _cascade(self, context: BrainContext, system_prompt: str, data: str, search_results: list) -> str | None:
+        """Cheap first pass on flash/low. Returns its facts if they pass the checks, else None to escalate.
+
+        Checks: the JSON parses, there is at least one fact, the self-reported confidence
+        clears `cascade_threshold`, and every cited URL is one of the search results
+        (an invented source means the fast model was guessing).
+        """
+        self.cascade_attempts += 1
+        with child_span("cascade", region=self.name, model=self.fast_llm().model_name) as span:
+            prompt = system_prompt + (
+                "\n\nReturn JSON with 'facts' (a list of short factual statements or logical steps) and "
+                "'confidence' (0-1): how sure you are that these facts are correct and fully answer the query. "
+                "Be honest: report low confidence for anything that needs multi-step reasoning you did not do."
+            )
+            facts = []
+            try:
+                raw = await self.fast_llm().agenerate(prompt, data, temperature=0.0, response_schema=CascadeDraft,
+                                                      deadline=context.deadline)
+                draft = CascadeDraft.model_validate_json(raw)
+                facts = [fact.strip() for fact in draft.facts if fact.strip()]
+                reason = None
+                if not facts:
+                    reason = "no facts"
+                elif draft.confidence < self.cascade_threshold:
+                    reason = f"confidence {draft.confidence:.2f} < {self.cascade_threshold:.2f}"
+                else:
+                    known = {r.get("url", "").rstrip("/") for r in search_results}
+                    unknown = [url for url in _URL_RE.findall(" ".join(facts)) if url.rstrip(".,;/") not in known]
+                    if unknown:
+                        reason = f"cites {len(unknown)} URL(s) not in the search results"
+                span.attributes["confidence"] = draft.confidence
+            except ValueError as e:
+                reason = f"unparseable draft ({e.__class__.__name__})"
+            except LLMCallError as e:
+                # Flash being overloaded says nothing about pro; only DeadlineExceeded propagates
+                reason = f"flash call failed after {e.attempts} attempt(s)"
+
+            # Out of time for the pro call: take the draft if there is one
+            if reason and facts and context.short_on_time(DEEP_REASONING_MIN_BUDGET):
+                context.degrade(self.name, f"{context.remaining():.1f}s left, keeping the flash draft ({reason}).")
+                reason = None
+
+            escalated = reason is not None
+            span.attributes["escalated"] = escalated
+            if escalated:
+                self.cascade_escalations += 1
+            outcome = f"escalating to {self.llm.model_name} ({reason})" if escalated else "flash answer accepted"
+            context.add_log(self.name, f"Cascade: {outcome}. Escalation rate {self.escalation_rate():.0%} "
+                                       f"({self.cascade_escalations}/{self.cascade_attempts}).")
+            return None if escalated else "\n".join(facts)
+
+    def escalation_rate(self) -> float:
+        return self.cascade_escalations / self.cascade_attempts if self.cascade_attempts else 0.0
+
+    def _recall_is_confident(self, context: BrainContext, threshold: float) -> bool:
+        return self.memory_first and bool(context.memories) and (context.memory_confidence or 0.0) >= threshold
+
+    @staticmethod
+    def _fanout_queries(context: BrainContext) -> list:
+        """The query itself plus one query per plan step, each step anchored to the query's topic."""
+        queries = [context.original_query]
+        for step in context.plan:
+            query = f"{step} ({context.original_query})"
+            queries.append(query if len(query) <= MAX_QUERY_CHARS else step)
+        return list(dict.fromkeys(queries))[:FANOUT_MAX_QUERIES]
+
+    async def _fanout_search(self, context: BrainContext, queries: list) -> list:
+        """Run the searches concurrently (bounded), then merge, dedupe and rank them into one list."""
+        limit = asyncio.Semaphore(FANOUT_CONCURRENCY)
+
+        async def one(query):
+            async with limit:
+                return await self.search_web(query, context=context)
+
+        with child_span("search.fanout", region=self.name) as span:
+            result_lists = await asyncio.gather(*(one(query) for query in queries))
+            merged, duplicates = merge_results(result_lists, FANOUT_MAX_RESULTS)
+            span.attributes.update(queries=len(queries), results=sum(map(len, result_lists)), kept=len(merged))
+        context.add_log(self.name, f"Fan-out search returned {sum(map(len, result_lists))} results over {len(queries)} queries; "
+                                   f"merged {duplicates} duplicates, keeping the top {len(merged)}.")
+        return merged
+
+    async def search_web(self, query: str, max_results: int = 5, context: BrainContext | None = None) -> list:
+        """Run a Tavily search on the async client (cached, with a hard timeout); logs cache hits to `context`."""
+        if not self.search_client.is_available:
+            return []
+        results, cached = await self.search_client.asearch(query, max_results=max_results)
+        if context is not None and self.search_client.cache is not None:
+            context.add_log(self.name, f"Search cache {'hit' if cached else 'miss'} "
+                                       f"({self.search_client.cache_stats()} this process).")
+        return results
+
     def _index_to_hippocampus(self, context: BrainContext, search_results: list):
         """Feed Tavily search results into HippoRAG for long-term memory indexing."""
         try:
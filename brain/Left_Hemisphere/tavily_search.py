@@ -1,63 +1,184 @@
-import os
-from typing import List, Dict, Optional
-
-
-class TavilySearchClient:
-    """Thin wrapper around the Tavily Python SDK for web search."""
-
-    def __init__(self):
-        self.api_key = os.getenv("TAVILY_API_KEY")
-        self.client = None
-
-        if not self.api_key:
-            print("[Tavily] Warning: TAVILY_API_KEY not found. Web search disabled.")
-            return
-
-        try:
-            from tavily import TavilyClient
-            self.client = TavilyClient(api_key=self.api_key)
-        except ImportError:
-            print("[Tavily] Warning: tavily-python not installed. Run: pip install tavily-python")
-        except Exception as e:
-            print(f"[Tavily] Warning: Failed to initialize client: {e}")
-
-    @property
-    def is_available(self) -> bool:
-        return self.client is not None
-
-    def search(self, query: str, max_results: int = 5) -> List[Dict[str, str]]:
-        """
-        Search the web using Tavily and return structured results.
-
-        Returns a list of dicts with keys: title, url, content
-        Returns an empty list on any failure.
-        """
-        if not self.client:
-            return []
-
-        try:
-            # Tavily API has a 400-character limit on queries
-            if len(query) > 400:
-                query = query[:400].rsplit(' ', 1)[0]
-                print(f"[Tavily] Warning: Query truncated to {len(query)} chars (max 400).")
-
-            response = self.client.search(
-                query=query,
-                max_results=max_results,
-                search_depth="basic",
-                include_answer=False,
-            )
-
-            results = []
-            for item in response.get("results", []):
-                results.append({
-                    "title": item.get("title", ""),
-                    "url": item.get("url", ""),
-                    "content": item.get("content", ""),
-                })
-
-            return results
-
-        except Exception as e:
-            print(f"[Tavily] Search error: {e}")
-            return []
+import asyncio
+import hashlib
+import json
+import os
+import re
+from typing import List, Dict, Optional, Tuple
+from brain.fusion import reciprocal_rank_fusion
+from brain.Hippocampus.dedup import hamming_distance, normalize_url, simhash
+from brain.response_cache import ResponseCache
+from brain.utils import env_path, state_path
+
+DEFAULT_SEARCH_CACHE_PATH = state_path("llm_cache", "search.sqlite")
+# Tavily API has a 400-character limit on queries
+MAX_QUERY_CHARS = 400
+
+
+def _clip_query(query: str) -> str:
+    if len(query) > MAX_QUERY_CHARS:
+        query = query[:MAX_QUERY_CHARS].rsplit(' ', 1)[0]
+        print(f"[Tavily] Warning: Query truncated to {len(query)} chars (max {MAX_QUERY_CHARS}).")
+    return query
+
+
+def search_cache_key(query: str, max_results: int, search_depth: str) -> str:
+    """Case and whitespace don't change what Tavily returns, so they don't change the key either."""
+    normalized = re.sub(r"\s+", " ", query).strip().lower()
+    return hashlib.sha256(json.dumps([normalized, max_results, search_depth]).encode("utf-8")).hexdigest()
+
+
+def _parse_results(response: dict) -> List[Dict[str, str]]:
+    return [{"title": item.get("title", ""), "url": item.get("url", ""), "content": item.get("content", "")}
+            for item in response.get("results", [])]
+
+
+def merge_results(result_lists: List[List[Dict[str, str]]], limit: int, max_distance: int = 3) -> Tuple[List[Dict[str, str]], int]:
+    """Merge several searches into one ranked list; returns (results, duplicates merged).
+
+    Results are fused by reciprocal rank on their normalized URL, so pages several searches agree
+    on come first. A page whose content is a near-duplicate (SimHash) of a better-ranked one is
+    dropped, so mirrors and syndicated copies don't crowd out other sources.
+    """
+    fused = [result for result, _ in reciprocal_rank_fusion(
+        result_lists, key=lambda r: normalize_url(r.get("url", "")) or r.get("content", ""))]
+    duplicates = sum(len(results) for results in result_lists) - len(fused)
+    merged, fingerprints = [], []
+    for result in fused:
+        fingerprint = simhash(result.get("content", ""))
+        if any(hamming_distance(fingerprint, other) <= max_distance for other in fingerprints):
+            duplicates += 1
+            continue
+        fingerprints.append(fingerprint)
+        merged.append(result)
+    return merged[:limit], duplicates
+
+
+class TavilySearchClient:
+    """Thin wrapper around the Tavily Python SDK for web search.
+
+    `asearch` uses the SDK's AsyncTavilyClient (one pooled httpx client per event loop) under a
+    hard timeout of BRAIN_SEARCH_TIMEOUT seconds. Both paths share an on-disk TTL cache keyed on
+    the normalized query, `max_results` and `search_depth` (BRAIN_SEARCH_CACHE, on by default).
+    """
+
+    def __init__(self):
+        self.api_key = os.getenv("TAVILY_API_KEY")
+        self.client = None
+        self._async_client = None
+        self._async_loop = None
+        self.timeout = float(os.getenv("BRAIN_SEARCH_TIMEOUT", "10"))
+        self.cache = self._cache_from_env()
+
+        if not self.api_key:
+            print("[Tavily] Warning: TAVILY_API_KEY not found. Web search disabled.")
+            return
+
+        try:
+            from tavily import TavilyClient
+            self.client = TavilyClient(api_key=self.api_key)
+        except ImportError:
+            print("[Tavily] Warning: tavily-python not installed. Run: pip install tavily-python")
+        except Exception as e:
+            print(f"[Tavily] Warning: Failed to initialize client: {e}")
+
+    @staticmethod
+    def _cache_from_env() -> Optional[ResponseCache]:
+        path = env_path("BRAIN_SEARCH_CACHE", DEFAULT_SEARCH_CACHE_PATH)
+        if path is None:
+            return None
+        return ResponseCache(
+            path,
+            max_entries=int(os.getenv("BRAIN_SEARCH_CACHE_MAX_ENTRIES", "5000")),
+            ttl=float(os.getenv("BRAIN_SEARCH_CACHE_TTL", str(6 * 3600))),
+        )
+
+    @property
+    def is_available(self) -> bool:
+        return self.client is not None
+
+    def cache_stats(self) -> str:
+        return f"{self.cache.hits} hits / {self.cache.misses} misses" if self.cache else "cache off"
+
+    def _cached(self, key: str) -> Optional[List[Dict[str, str]]]:
+        if self.cache is None:
+            return None
+        cached = self.cache.get(key)
+        return json.loads(cached) if cached is not None else None
+
+    def _store(self, key: str, search_depth: str, results: List[Dict[str, str]]):
+        # An empty list is usually a failure, not an answer worth keeping
+        if self.cache is not None and results:
+            self.cache.put(key, f"tavily:{search_depth}", json.dumps(results, ensure_ascii=False))
+
+    def search(self, query: str, max_results: int = 5, search_depth: str = "basic") -> List[Dict[str, str]]:
+        """
+        Search the web using Tavily and return structured results.
+
+        Returns a list of dicts with keys: title, url, content
+        Returns an empty list on any failure.
+        """
+        if not self.client:
+            return []
+
+        try:
+            query = _clip_query(query)
+            key = search_cache_key(query, max_results, search_depth)
+            cached = self._cached(key)
+            if cached is not None:
+                return cached
+
+            response = self.client.search(
+                query=query,
+                max_results=max_results,
+                search_depth=search_depth,
+                include_answer=False,
+                timeout=self.timeout,
+            )
+
+            results = _parse_results(response)
+            self._store(key, search_depth, results)
+            return results
+
+        except Exception as e:
+            print(f"[Tavily] Search error: {e}")
+            return []
+
+    def _aclient(self):
+        """The async SDK client for the running event loop; its httpx pool keeps connections alive between searches."""
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            from tavily import AsyncTavilyClient
+            self._async_client, self._async_loop = AsyncTavilyClient(api_key=self.api_key), loop
+        return self._async_client
+
+    async def asearch(self, query: str, max_results: int = 5, search_depth: str = "basic") -> Tuple[List[Dict[str, str]], bool]:
+        """
+        Async `search`: returns (results, served_from_cache).
+
+        The request is abandoned after `timeout` seconds; like `search`, failures return no results.
+        """
+        if not self.client:
+            return [], False
+
+        query = _clip_query(query)
+        key = search_cache_key(query, max_results, search_depth)
+        cached = await asyncio.to_thread(self._cached, key)
+        if cached is not None:
+            return cached, True
+
+        try:
+            response = await asyncio.wait_for(
+                self._aclient().search(query=query, max_results=max_results, search_depth=search_depth,
+                                       include_answer=False, timeout=self.timeout),
+                self.timeout,
+            )
+        except asyncio.TimeoutError:
+            print(f"[Tavily] Search timed out after {self.timeout:g}s.")
+            return [], False
+        except Exception as e:
+            print(f"[Tavily] Search error: {e}")
+            return [], False
+
+        results = _parse_results(response)
+        await asyncio.to_thread(self._store, key, search_depth, results)
+        return results, False
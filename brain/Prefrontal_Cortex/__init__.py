@@ -1,4 +1,6 @@
+import os
 from brain.Prefrontal_Cortex.routing_engine import PFCRouter
+from brain.Prefrontal_Cortex.local_router import LocalRouter
 from brain.Prefrontal_Cortex.planner import PFCPlanner
 from brain.core import BrainRegion, LLMClient
 from brain.schemas import BrainContext
@@ -10,17 +12,26 @@ class PrefrontalCortex(BrainRegion):
         # Creating a specialized faster client for the router
         router_llm = LLMClient(model_name='gemini-3-flash-preview')
         
-        self.router = PFCRouter(router_llm, name)
+        self.router = PFCRouter(
+            router_llm, name,
+            local_router=LocalRouter.load(),
+            confidence_threshold=float(os.getenv("BRAIN_ROUTER_THRESHOLD", "0.85")),
+        )
         self.planner = PFCPlanner("Prefrontal Cortex (Planner)", llm)
 
-    def decide_flow(self, query: str) -> tuple[str, str]:
-        return self.router.decide_flow(query)
+    async def decide_flow(self, query: str, deadline: float | None = None) -> tuple[str, str]:
+        return await self.router.decide_flow(query, deadline)
+
+    async def route_and_plan(self, query: str, deadline: float | None = None) -> tuple[str, str | None, list[str] | None]:
+        return await self.router.route_and_plan(query, deadline)
 
-    def quick_reply(self, context: BrainContext, content: str = None) -> BrainContext:
+    async def quick_reply(self, context: BrainContext, content: str = None) -> BrainContext:
         if content:
              # Optimization: Use the content we already got from the router
              context.add_log(self.router.name, "Fast response generated during routing.")
              context.final_output = content
+             if context.on_token:
+                 context.emit_token(content)
              context.current_stage = "Quick Response (Cached)"
              return context
         # Fallback if content wasn't cached (e.g. manual CLI usage)
@@ -31,9 +42,10 @@ class PrefrontalCortex(BrainRegion):
             "Answer directly, concisely, and helpfully."
         )
         # We access the router's efficient LLM directly
-        context.final_output = self.router.llm.generate(system_prompt, context.original_query)
+        context.final_output = await self.router.llm.agenerate(system_prompt, context.original_query, on_token=context.token_sink(),
+                                                                deadline=context.deadline)
         context.current_stage = "Quick Response (Fallback)"
         return context
 
-    def process(self, context: BrainContext) -> BrainContext:
-        return self.planner.process(context)
+    async def process(self, context: BrainContext) -> BrainContext:
+        return await self.planner.process(context)
@@ -0,0 +1,147 @@
+import json
+import math
+import os
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from brain.utils import state_path
+
+ROUTER_DIR = state_path("router_storage")
+DEFAULT_MODEL_PATH = os.path.join(ROUTER_DIR, "local_router.json")
+DEFAULT_LOG_PATH = os.path.join(ROUTER_DIR, "routing_log.jsonl")
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased words plus word bigrams ('write a' / 'a poem' carry most of the routing signal)."""
+    words = _WORD_RE.findall(text.lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+class LocalRouter:
+    """Multinomial Naive Bayes over query n-grams, trained on logged (query, flow) decisions.
+
+    Pure Python with precomputed log-probability tables, so `predict` is a handful of dict
+    lookups per token and answers in microseconds.
+    """
+
+    def __init__(self, alpha: float = 1.0):
+        self.alpha = alpha  # Laplace smoothing
+        self.log_prior: Dict[str, float] = {}
+        self.log_likelihood: Dict[str, Dict[str, float]] = {}
+        self.log_unseen: Dict[str, float] = {}
+        self.num_examples = 0
+
+    def fit(self, examples: List[Tuple[str, str]]) -> "LocalRouter":
+        class_counts = Counter(flow for _, flow in examples)
+        token_counts = {flow: Counter() for flow in class_counts}
+        for query, flow in examples:
+            token_counts[flow].update(tokenize(query))
+
+        vocab = set()
+        for counts in token_counts.values():
+            vocab.update(counts)
+        vocab_size = max(len(vocab), 1)
+
+        self.num_examples = len(examples)
+        self.log_prior = {flow: math.log(n / len(examples)) for flow, n in class_counts.items()}
+        self.log_likelihood, self.log_unseen = {}, {}
+        for flow, counts in token_counts.items():
+            denom = sum(counts.values()) + self.alpha * vocab_size
+            self.log_likelihood[flow] = {tok: math.log((n + self.alpha) / denom) for tok, n in counts.items()}
+            self.log_unseen[flow] = math.log(self.alpha / denom)
+        return self
+
+    def predict(self, query: str) -> Tuple[Optional[str], float]:
+        """Return (flow, posterior probability), or (None, 0.0) when untrained."""
+        if not self.log_prior:
+            return None, 0.0
+
+        tokens = tokenize(query)
+        scores = {}
+        for flow, prior in self.log_prior.items():
+            table, unseen = self.log_likelihood[flow], self.log_unseen[flow]
+            scores[flow] = prior + sum(table.get(tok, unseen) for tok in tokens)
+
+        best = max(scores, key=scores.get)
+        # Softmax in log space for the posterior of the winning label
+        total = sum(math.exp(score - scores[best]) for score in scores.values())
+        return best, 1.0 / total
+
+    def save(self, path: str = DEFAULT_MODEL_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({
+                "alpha": self.alpha,
+                "num_examples": self.num_examples,
+                "log_prior": self.log_prior,
+                "log_likelihood": self.log_likelihood,
+                "log_unseen": self.log_unseen,
+            }, f)
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_MODEL_PATH) -> Optional["LocalRouter"]:
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"[Local Router] Could not load {path}: {e}")
+            return None
+        router = cls(alpha=data.get("alpha", 1.0))
+        router.num_examples = data.get("num_examples", 0)
+        router.log_prior = data["log_prior"]
+        router.log_likelihood = data["log_likelihood"]
+        router.log_unseen = data["log_unseen"]
+        return router
+
+
+def log_decision(query: str, flow: str, path: str = DEFAULT_LOG_PATH):
+    """Append one LLM routing decision; these are the training labels for the local router."""
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"query": query, "flow": flow}) + "\n")
+    except OSError as e:
+        print(f"[Local Router] Could not log routing decision: {e}")
+
+
+def load_routing_log(path: str = DEFAULT_LOG_PATH) -> List[Tuple[str, str]]:
+    examples = []
+    if not os.path.exists(path):
+        return examples
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                examples.append((record["query"], record["flow"]))
+            except (json.JSONDecodeError, KeyError):
+                continue
+    return examples
+
+
+def train_from_log(log_path: str = DEFAULT_LOG_PATH, model_path: str = DEFAULT_MODEL_PATH,
+                   min_examples: int = 50) -> dict:
+    """Retrain the local router from the routing log and save it.
+
+    Accuracy is measured on a held-out fifth of the log before refitting on everything.
+    """
+    examples = load_routing_log(log_path)
+    if len(examples) < min_examples:
+        raise ValueError(f"Only {len(examples)} logged decisions in {log_path}; need at least {min_examples}.")
+
+    holdout = examples[::5]
+    train = [ex for i, ex in enumerate(examples) if i % 5]
+    probe = LocalRouter().fit(train)
+    correct = sum(probe.predict(query)[0] == flow for query, flow in holdout)
+
+    router = LocalRouter().fit(examples)
+    router.save(model_path)
+    return {
+        "examples": len(examples),
+        "holdout_accuracy": correct / len(holdout) if holdout else 0.0,
+        "class_counts": dict(Counter(flow for _, flow in examples)),
+        "model_path": model_path,
+    }
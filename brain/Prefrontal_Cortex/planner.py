@@ -1,11 +1,27 @@
+import os
 from brain.core import BrainRegion
+from brain.prompt_packer import PromptPacker, format_bullets
+from brain.rate_limit import estimate_tokens
 from brain.schemas import BrainContext
 
+# Deadline thresholds (seconds of budget left): below these, skip synthesis / planning
+SYNTHESIS_MIN_BUDGET = 6.0
+PLANNING_MIN_BUDGET = 4.0
+# Token budget for the synthesis prompt; the creative draft is always kept whole, facts fill the rest
+PROMPT_BUDGET = int(os.getenv("BRAIN_PROMPT_BUDGET_PFC", "4000"))
+
 class PFCPlanner(BrainRegion):
-    def process(self, context: BrainContext) -> BrainContext:
+    async def process(self, context: BrainContext) -> BrainContext:
         context.add_log(self.name, "Analyzing query and creating plan...")
         
-        if context.logical_facts and context.creative_draft:
+        if context.logical_facts and context.creative_draft and context.short_on_time(SYNTHESIS_MIN_BUDGET):
+            context.degrade(self.name, f"{context.remaining():.1f}s left, skipping synthesis and answering with the creative draft.")
+            context.final_output = context.creative_draft
+            if context.on_token:
+                context.emit_token(context.creative_draft)
+            context.current_stage = "Synthesis Skipped"
+
+        elif context.logical_facts and context.creative_draft:
              # Synthesis Mode (Parallel Flow End)
              system_prompt = (
                 "You are the Prefrontal Cortex, the executive center. "
@@ -13,10 +29,23 @@ class PFCPlanner(BrainRegion):
                 "Synthesize them into one perfect, balanced response. "
                 "Maintain the accuracy of the Left but the engagement of the Right."
             )
-             user_content = f"Query: {context.original_query}\n\nLogical Data: {context.logical_facts}\n\nCreative Draft: {context.creative_draft}"
-             context.final_output = self.llm.generate(system_prompt, user_content)
+             packed = PromptPacker(PROMPT_BUDGET).pack(
+                 context.original_query, {"facts": context.logical_facts},
+                 reserved_tokens=estimate_tokens(system_prompt + context.original_query + context.creative_draft),
+                 keep_order=("facts",),
+             )
+             context.add_log(self.name, f"Synthesis prompt {packed.summary()}.")
+             user_content = (f"Query: {context.original_query}\n\nLogical Data:\n{format_bullets(packed.sections['facts'])}"
+                             f"\n\nCreative Draft:\n{context.creative_draft}")
+             context.final_output = await self.llm.agenerate(system_prompt, user_content, on_token=context.token_sink(),
+                                                             deadline=context.deadline)
              context.current_stage = "Synthesis Complete"
         
+        elif context.short_on_time(PLANNING_MIN_BUDGET):
+            context.degrade(self.name, f"{context.remaining():.1f}s left, skipping planning (the query is the plan).")
+            context.plan = [context.original_query]
+            context.current_stage = "Planned"
+
         else:
             # Planning Mode
             system_prompt = (
@@ -25,7 +54,7 @@ class PFCPlanner(BrainRegion):
                 "Break down the user's query into a list of 3-5 clear, actionable steps for the other brain regions. "
                 "Return valid JSON formatted list of strings."
             )
-            raw_plan = self.llm.generate(system_prompt, context.original_query)
+            raw_plan = await self.llm.agenerate(system_prompt, context.original_query, deadline=context.deadline)
             # Naive parsing
             context.plan = [line.strip('- ') for line in raw_plan.split('\n') if line.strip().startswith('-') or line.strip().startswith('*')] 
             if not context.plan: context.plan = [raw_plan] # Fallback
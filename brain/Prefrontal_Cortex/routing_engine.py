@@ -1,33 +1,54 @@
-from brain.core import BrainRegion
-from brain.schemas import BrainContext
+from brain.core import BrainRegion, DeadlineExceeded
+from brain.rate_limit import LLMCallError
+from brain.schemas import BrainContext, RoutingDecision
+from brain.Prefrontal_Cortex.local_router import LocalRouter, log_decision
+
+VALID_FLOWS = ["logical", "creative", "sequential", "parallel", "fast"]
+
+ROUTER_PROMPT = (
+    "You are the Prefrontal Cortex, the brain's decision maker. "
+    "Analyze the user query and select the best processing flow."
+    "\nOptions:"
+    "\n1. 'logical': For pure math, coding, facts, or scientific questions."
+    "\n2. 'creative': For poetry, stories, art, or subjective topics."
+    "\n3. 'sequential': For complex topics needing BOTH deep explanation and good writing."
+    "\n4. 'parallel': For brainstorming or A/B testing diverse perspectives."
+    "\n5. 'fast': For trivial greetings, simple factual questions, or queries not requiring deep thought. IF and ONLY IF you choose 'fast', provide the answer immediately in 'content'."
+)
 
 #TODO : instead of LLM calls need to actually train algo to do the routing based on EEG signals, but for now this should work
 
 class PFCRouter:
-    def __init__(self, llm_client, name="Prefrontal Cortex (Router)"):
+    def __init__(self, llm_client, name="Prefrontal Cortex (Router)", local_router: LocalRouter | None = None,
+                 confidence_threshold: float = 0.85):
         self.llm = llm_client
         self.name = name
+        # Learned from logged LLM decisions; consulted first, LLM only below the threshold
+        self.local_router = local_router
+        self.confidence_threshold = confidence_threshold
 
-    def decide_flow(self, query: str) -> tuple[str, str | None]:
+    async def decide_flow(self, query: str, deadline: float | None = None) -> tuple[str, str | None]:
         """Decides flow and optionally provides quick answer in one shot."""
+        if self.local_router:
+            flow, confidence = self.local_router.predict(query)
+            if flow and confidence >= self.confidence_threshold:
+                print(f"[Prefrontal Cortex] Decision: Routing to '{flow}' flow (local router, p={confidence:.2f}).")
+                return flow, None
+
+        return await self._decide_flow_llm(query, deadline)
+
+    async def _decide_flow_llm(self, query: str, deadline: float | None = None) -> tuple[str, str | None]:
         # self.llm.generate("Warmup", "Warmup") # Skip warmup for speed
         
         system_prompt = (
-            "You are the Prefrontal Cortex, the brain's decision maker. "
-            "Analyze the user query and select the best processing flow."
-            "\nOptions:"
-            "\n1. 'logical': For pure math, coding, facts, or scientific questions."
-            "\n2. 'creative': For poetry, stories, art, or subjective topics."
-            "\n3. 'sequential': For complex topics needing BOTH deep explanation and good writing."
-            "\n4. 'parallel': For brainstorming or A/B testing diverse perspectives."
-            "\n5. 'fast': For trivial greetings, simple factual questions, or queries not requiring deep thought. IF and ONLY IF you choose 'fast', provide the answer immediately in 'content'."
+            ROUTER_PROMPT +
             "\n\nReturn a valid JSON object with keys: 'flow' (str) and 'content' (str or null)."
             "\nExample Fast: {\"flow\": \"fast\", \"content\": \"Hello! How can I help?\"}"
             "\nExample Logical: {\"flow\": \"logical\", \"content\": null}"
         )
         
         try:
-            response = self.llm.generate(system_prompt, query, temperature=0.2).strip()
+            response = (await self.llm.agenerate(system_prompt, query, temperature=0.2, deadline=deadline)).strip()
             # Clean up potential markdown code blocks
             if response.startswith("```"):
                 response = response.strip("`").replace("json", "").strip()
@@ -37,15 +58,55 @@ class PFCRouter:
             flow = data.get("flow", "sequential").lower()
             content = data.get("content")
             
+        except (DeadlineExceeded, LLMCallError):
+            # Out of time or the API gave up: not a parse problem, and not a reason to start the costliest flow
+            raise
         except Exception as e:
             print(f"[Router Error] JSON Parse Failed: {e}. Defaulting to Sequential.")
             return "sequential", None
         
         # Validation
-        valid_flows = ["logical", "creative", "sequential", "parallel", "fast"]
-        if flow not in valid_flows: flow = "sequential"
+        if flow not in VALID_FLOWS: flow = "sequential"
         
         print(f"[Prefrontal Cortex] Decision: Routing to '{flow}' flow.")
+        log_decision(query, flow)
         return flow, content
 
+    async def route_and_plan(self, query: str, deadline: float | None = None) -> tuple[str, str | None, list[str] | None]:
+        """Fused mode: flow, quick answer and plan from one structured-output call.
+
+        Saves the separate planner round trip on every non-fast query. Returns a None plan
+        when the local router answered (or parsing failed), in which case the flow plans as usual.
+        """
+        if self.local_router:
+            flow, confidence = self.local_router.predict(query)
+            if flow and confidence >= self.confidence_threshold:
+                print(f"[Prefrontal Cortex] Decision: Routing to '{flow}' flow (local router, p={confidence:.2f}).")
+                return flow, None, None
+
+        system_prompt = (
+            ROUTER_PROMPT +
+            "\n\nYou are also the Architect of this brain. If you do NOT choose 'fast', break the query down into "
+            "3-5 clear, actionable steps for the other brain regions and return them in 'plan'. For 'fast', 'plan' is null."
+            "\n\nReturn a JSON object with keys: 'flow' (str), 'content' (str or null) and 'plan' (list of str or null)."
+        )
+
+        try:
+            response = await self.llm.agenerate(system_prompt, query, temperature=0.2, response_schema=RoutingDecision,
+                                                deadline=deadline)
+            decision = RoutingDecision.model_validate_json(response)
+        except (DeadlineExceeded, LLMCallError):
+            raise
+        except Exception as e:
+            print(f"[Router Error] Fused decision parse failed: {e}. Defaulting to Sequential.")
+            return "sequential", None, None
+
+        flow = decision.flow.lower()
+        if flow not in VALID_FLOWS: flow = "sequential"
+        plan = [step.strip() for step in (decision.plan or []) if step.strip()] or None
+
+        print(f"[Prefrontal Cortex] Decision: Routing to '{flow}' flow (fused with planning).")
+        log_decision(query, flow)
+        return flow, decision.content, plan
+
 
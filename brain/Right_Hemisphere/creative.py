@@ -1,8 +1,16 @@
+import os
 from brain.core import BrainRegion
+from brain.prompt_packer import PromptPacker, format_bullets
+from brain.rate_limit import estimate_tokens
 from brain.schemas import BrainContext
 
+# Below this many seconds of budget the draft is written by the flash model
+FULL_MODEL_MIN_BUDGET = 10.0
+# Token budget for the creative prompt (facts, or plan + memories)
+PROMPT_BUDGET = int(os.getenv("BRAIN_PROMPT_BUDGET_RIGHT", "3000"))
+
 class RightHemisphere(BrainRegion):
-    def process(self, context: BrainContext) -> BrainContext:
+    async def process(self, context: BrainContext) -> BrainContext:
         context.add_log(self.name, "Synthesizing creative output...")
         
         system_prompt = (
@@ -12,21 +20,34 @@ class RightHemisphere(BrainRegion):
             "Make it human, poetic, or engaging."
         )
         
+        packer = PromptPacker(PROMPT_BUDGET)
         if context.logical_facts:
             # Sequential mode input
-            data = f"Query: {context.original_query}\nDry Facts: {context.logical_facts}"
+            packed = packer.pack(context.original_query, {"facts": context.logical_facts},
+                                 reserved_tokens=estimate_tokens(system_prompt + context.original_query),
+                                 keep_order=("facts",))
+            data = f"Query: {context.original_query}\nDry Facts:\n{format_bullets(packed.sections['facts'])}"
         else:
              # Parallel mode input (raw query + plan)
              # OR Creative Mode input (Logical facts might be None)
-             data = f"Query: {context.original_query}\nPlan: {context.plan}\nContext: {context.memories}"
+             plan = format_bullets(context.plan)
+             packed = packer.pack(f"{context.original_query} {' '.join(context.plan or [])}", {"memories": context.memories},
+                                  reserved_tokens=estimate_tokens(system_prompt + context.original_query + plan))
+             data = f"Query: {context.original_query}\nPlan:\n{plan}\nContext:\n{format_bullets(packed.sections['memories'])}"
+        context.add_log(self.name, f"Prompt {packed.summary()}.")
 
         # High temperature for creativity
-        context.final_output = self.llm.generate(system_prompt, data, temperature=0.9)
+        sink = context.token_sink()
+        llm = self.llm_for(context, FULL_MODEL_MIN_BUDGET)
+        context.final_output = await llm.agenerate(system_prompt, data, temperature=0.9, on_token=sink, deadline=context.deadline)
         # Store as draft if we are in parallel mode (PFC will synthesize later) - detecting by caller but simpler to just store in final_output for sequential
         context.creative_draft = context.final_output
         
         # In sequential, this is the final, but we log it as the Right Brain's work
-        context.add_log(self.name, f"Creative Output:\n{context.final_output }")
+        if sink:
+            context.add_log(self.name, f"Creative Output streamed ({len(context.final_output)} chars).")
+        else:
+            context.add_log(self.name, f"Creative Output:\n{context.final_output }")
         
         context.current_stage = "Creating (Art)"
         return context
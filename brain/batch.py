@@ -0,0 +1,119 @@
+import asyncio
+import json
+import os
+import time
+from typing import List
+from brain.utils import percentile
+from brain.network import BrainNetwork
+from brain.tracing import write_trace
+
+
+def load_queries(input_path: str) -> List[dict]:
+    """Read a JSONL file of {"id"?, "query", "flow"?} objects (bare JSON strings are accepted too)."""
+    queries = []
+    with open(input_path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            if isinstance(item, str):
+                item = {"query": item}
+            item.setdefault("id", str(line_no))
+            item["id"] = str(item["id"])
+            queries.append(item)
+    return queries
+
+
+def load_completed(output_path: str) -> set:
+    """Ids that already have a successful result, so a rerun resumes instead of starting over."""
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # partially written line from an interrupted run
+            if not record.get("error"):
+                completed.add(str(record.get("id")))
+    return completed
+
+
+async def run_batch(network: BrainNetwork, input_path: str, output_path: str, concurrency: int = 8,
+                    flow: str = "auto", speculative: bool = False, fused: bool = False,
+                    trace_dir: str | None = None, trace_format: str = "chrome", deadline: float | None = None) -> dict:
+    """Run every query in `input_path` through one BrainNetwork with at most `concurrency` in flight.
+
+    Results are appended to `output_path` as each query finishes (with per-stage timings),
+    queries already answered there are skipped, and aggregate throughput/latency is returned.
+    """
+    queries = load_queries(input_path)
+    completed = load_completed(output_path)
+    todo = [q for q in queries if q["id"] not in completed]
+    print(f"[Batch] {len(queries)} queries, {len(completed)} already done, {len(todo)} to run (concurrency={concurrency}).")
+
+    queue: asyncio.Queue = asyncio.Queue()
+    for item in todo:
+        queue.put_nowait(item)
+
+    latencies: List[float] = []
+    failures = 0
+
+    with open(output_path, "a+", encoding="utf-8") as out:
+        # An interrupted run can leave a half-written last line; start ours on a fresh one
+        if out.tell() > 0:
+            out.seek(out.tell() - 1)
+            if out.read(1) != "\n":
+                out.write("\n")
+
+        async def worker():
+            nonlocal failures
+            while True:
+                try:
+                    item = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+
+                record = {"id": item["id"], "query": item["query"]}
+                start = time.perf_counter()
+                try:
+                    ctx = await network.run(item["query"], flow=item.get("flow", flow), speculative=speculative, fused=fused,
+                                            deadline=item.get("deadline", deadline))
+                    record.update({
+                        "final_output": ctx.final_output,
+                        "stage": ctx.current_stage,
+                        "stage_timings": {k: round(v, 4) for k, v in ctx.stage_timings.items()},
+                    })
+                    if ctx.degradations:
+                        record["degradations"] = ctx.degradations
+                    if trace_dir:
+                        record["trace"] = write_trace(ctx, trace_dir, trace_format)
+                except Exception as e:
+                    failures += 1
+                    record["error"] = str(e)
+                elapsed = time.perf_counter() - start
+                record["latency"] = round(elapsed, 4)
+                if "error" not in record:
+                    latencies.append(elapsed)
+
+                # Single-threaded event loop: each line is written whole, in completion order
+                out.write(json.dumps(record, default=str) + "\n")
+                out.flush()
+
+        batch_start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+        wall = time.perf_counter() - batch_start
+
+    stats = {
+        "completed": len(latencies),
+        "failed": failures,
+        "skipped": len(queries) - len(todo),
+        "wall_time": round(wall, 3),
+        "throughput_qps": round(len(latencies) / wall, 3) if wall > 0 else 0.0,
+        "p50": round(percentile(latencies, 50), 3),
+        "p95": round(percentile(latencies, 95), 3),
+        "p99": round(percentile(latencies, 99), 3),
+    }
+    return stats
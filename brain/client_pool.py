@@ -0,0 +1,228 @@
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+from google import genai
+from brain.rate_limit import LLMCallError, RateLimiter, backoff_delay, estimate_tokens, is_retryable, parse_rate_limits
+
+T = TypeVar("T")
+
+DEFAULT_CONCURRENCY = 8
+
+
+def parse_limits(spec: str) -> Dict[str, int]:
+    """Parse 'gemini-3-pro-preview=4,gemini-embedding=16,default=8' into {model: cap}."""
+    limits = {}
+    for item in spec.split(","):
+        model, _, value = item.partition("=")
+        if model.strip() and value.strip():
+            limits[model.strip()] = int(value)
+    return limits
+
+
+class ModelSlots:
+    """A counting semaphore usable from both coroutines and plain threads.
+
+    Region calls await it on the event loop while HippoRAG calls block on it from worker
+    threads, so both kinds of caller draw from the same per-model cap. Freed slots go to
+    waiters in FIFO order.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self.in_use = 0
+        self._lock = threading.Lock()
+        self._waiters = deque()  # threading.Event or (loop, asyncio.Future)
+
+    def acquire(self):
+        with self._lock:
+            if self.in_use < self.limit and not self._waiters:
+                self.in_use += 1
+                return
+            event = threading.Event()
+            self._waiters.append(event)
+        event.wait()  # the releaser hands its slot over, in_use is unchanged
+
+    async def aacquire(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self.in_use < self.limit and not self._waiters:
+                self.in_use += 1
+                return
+            future = loop.create_future()
+            waiter = (loop, future)
+            self._waiters.append(waiter)
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                granted = waiter not in self._waiters
+                if not granted:
+                    self._waiters.remove(waiter)
+            # Handed a slot just as we were cancelled: give it back. If the future itself was
+            # cancelled, `_grant` has not run yet and will pass the slot on instead.
+            if granted and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if isinstance(waiter, threading.Event):
+                    waiter.set()
+                    return
+                loop, future = waiter
+                if not loop.is_closed():
+                    loop.call_soon_threadsafe(_grant, future, self)
+                    return
+            self.in_use -= 1
+
+
+def _grant(future: asyncio.Future, slots: ModelSlots):
+    if future.cancelled():
+        slots.release()  # cancelled between hand-over and wake-up; pass the slot on
+    else:
+        future.set_result(None)
+
+
+class ClientPool:
+    """Process-wide genai.Client plus a concurrency cap, rate limiter and retry policy per model.
+
+    Every LLMClient, and HippoRAG's Gemini LLM and embedding model, go through the same
+    client, so they share one HTTP connection pool (and its keep-alive connections) instead
+    of opening their own, and draw from the same per-model quota. Caps come from
+    BRAIN_MODEL_CONCURRENCY, e.g. 'gemini-3-pro-preview=4,gemini-embedding=16,default=8';
+    quotas from BRAIN_MODEL_RATE_LIMITS, e.g. 'gemini-3-pro-preview=25:1000000' (RPM:TPM).
+    """
+
+    def __init__(self, api_key: str, limits: Optional[Dict[str, int]] = None,
+                 rate_limits: Optional[Dict[str, Tuple[Optional[int], Optional[int]]]] = None,
+                 max_retries: int = 4):
+        self.client = genai.Client(api_key=api_key)
+        self.limits = dict(limits or {})
+        self.default_limit = self.limits.pop("default", DEFAULT_CONCURRENCY)
+        self.rate_limits = dict(rate_limits or {})
+        self.default_rate_limit = self.rate_limits.pop("default", (None, None))
+        self.max_retries = max_retries
+        self._slots: Dict[str, ModelSlots] = {}
+        self._limiters: Dict[str, RateLimiter] = {}
+        self._lock = threading.Lock()
+
+    def slots(self, model: str) -> ModelSlots:
+        with self._lock:
+            if model not in self._slots:
+                self._slots[model] = ModelSlots(self.limits.get(model, self.default_limit))
+            return self._slots[model]
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """The brain's token estimate, exposed so HippoRAG's Gemini wrappers reserve quota the same way."""
+        return estimate_tokens(text)
+
+    def limiter(self, model: str) -> RateLimiter:
+        with self._lock:
+            if model not in self._limiters:
+                self._limiters[model] = RateLimiter(*self.rate_limits.get(model, self.default_rate_limit))
+            return self._limiters[model]
+
+    async def acall(self, model: str, fn: Callable[[], Awaitable[T]], estimated_tokens: int = 0,
+                    can_retry: Callable[[], bool] = lambda: True, on_retry: Callable[[int, Exception, float], None] | None = None) -> T:
+        """Await `fn()` under the model's quota and concurrency cap, retrying transient failures.
+
+        Each attempt first waits for its rate-limit reservation, then holds a slot only while
+        the request is in flight (never while backing off). 429s and 5xx are retried with
+        jittered exponential backoff that respects the server's retry hint, unless
+        `can_retry()` says the attempt already had side effects (e.g. streamed tokens).
+        Raises LLMCallError once retries are exhausted.
+        """
+        limiter = self.limiter(model)
+        for attempt in range(self.max_retries + 1):
+            wait = limiter.reserve(estimated_tokens)
+            if wait:
+                await asyncio.sleep(wait)
+            try:
+                async with self.aslot(model):
+                    result = await fn()
+                limiter.settle(estimated_tokens, _total_tokens(result))
+                return result
+            except Exception as e:
+                if attempt == self.max_retries or not is_retryable(e) or not can_retry():
+                    raise LLMCallError(model, attempt + 1, e) from e
+                delay = backoff_delay(attempt, e)
+                if on_retry:
+                    on_retry(attempt + 1, e, delay)
+                await asyncio.sleep(delay)
+
+    def call(self, model: str, fn: Callable[[], T], estimated_tokens: int = 0,
+             on_retry: Callable[[int, Exception, float], None] | None = None) -> T:
+        """Blocking counterpart of `acall` for worker threads (HippoRAG, LLMClient.generate)."""
+        limiter = self.limiter(model)
+        for attempt in range(self.max_retries + 1):
+            wait = limiter.reserve(estimated_tokens)
+            if wait:
+                time.sleep(wait)
+            try:
+                with self.slot(model):
+                    result = fn()
+                limiter.settle(estimated_tokens, _total_tokens(result))
+                return result
+            except Exception as e:
+                if attempt == self.max_retries or not is_retryable(e):
+                    raise LLMCallError(model, attempt + 1, e) from e
+                delay = backoff_delay(attempt, e)
+                if on_retry:
+                    on_retry(attempt + 1, e, delay)
+                time.sleep(delay)
+
+    @asynccontextmanager
+    async def aslot(self, model: str):
+        slots = self.slots(model)
+        await slots.aacquire()
+        try:
+            yield
+        finally:
+            slots.release()
+
+    @contextmanager
+    def slot(self, model: str):
+        slots = self.slots(model)
+        slots.acquire()
+        try:
+            yield
+        finally:
+            slots.release()
+
+    def stats(self) -> Dict[str, dict]:
+        with self._lock:
+            return {model: {"limit": s.limit, "in_use": s.in_use, "waiting": len(s._waiters)}
+                    for model, s in self._slots.items()}
+
+
+def _total_tokens(result) -> Optional[int]:
+    usage = getattr(result, "usage_metadata", None)
+    return getattr(usage, "total_token_count", None) if usage is not None else None
+
+
+_pool: Optional[ClientPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ClientPool:
+    """The shared pool, created on first use from GEMINI_API_KEY and the BRAIN_MODEL_* settings."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            api_key = os.getenv("GEMINI_API_KEY")
+            if not api_key:
+                raise ValueError("GEMINI_API_KEY not found in environment variables.")
+            _pool = ClientPool(
+                api_key,
+                parse_limits(os.getenv("BRAIN_MODEL_CONCURRENCY", "")),
+                parse_rate_limits(os.getenv("BRAIN_MODEL_RATE_LIMITS", "")),
+                int(os.getenv("BRAIN_LLM_MAX_RETRIES", "4")),
+            )
+        return _pool
@@ -1,11 +1,25 @@
+import asyncio
 import os
-from google import genai
+import time
+from typing import Callable
 from google.genai import types
+from brain.client_pool import get_pool
+from brain.hedging import get_hedge_policy
+from brain.rate_limit import estimate_tokens
+from brain.response_cache import cache_key, get_response_cache
 from brain.schemas import BrainContext
+from brain.tracing import child_span, record_usage
+
+FAST_MODEL = 'gemini-3-flash-preview'
+
+
+class DeadlineExceeded(TimeoutError):
+    """The query's deadline passed while a call was in flight; the call was cancelled."""
+
 
 class LLMClient:
     """Wrapper around a Gemini model via the google-genai SDK.
-    
+
     Args:
         model_name: Gemini model identifier (e.g. 'gemini-3-pro-preview').
         thinking: Thinking level — 'low', 'high', or None for model default.
@@ -14,41 +28,225 @@ class LLMClient:
                   None   → model default (high for Gemini 3).
     """
     def __init__(self, model_name: str = 'gemini-3-pro-preview', thinking: str | None = None):
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY not found in environment variables.")
-        self.client = genai.Client(api_key=api_key)
+        # One genai.Client per process: connections and per-model concurrency caps are shared
+        self.pool = get_pool()
+        self.client = self.pool.client
         self.model_name = model_name
         self.thinking = thinking  # 'low', 'high', or None
+        # Opt-in on-disk cache (BRAIN_LLM_CACHE); only near-deterministic calls are cached
+        self.cache = get_response_cache()
+        self.cache_max_temperature = float(os.getenv("BRAIN_LLM_CACHE_MAX_TEMPERATURE", "0.2"))
+        # Shared latency histograms and tail-latency hedging (BRAIN_HEDGE)
+        self.hedge = get_hedge_policy()
+
+    def _cache_key(self, system_prompt: str, user_content: str, temperature: float, response_schema=None) -> str | None:
+        if self.cache is None or temperature > self.cache_max_temperature:
+            return None
+        return cache_key(self.model_name, self.thinking, temperature, system_prompt, user_content, response_schema)
+
+    def _build_config(self, temperature: float, response_schema=None) -> types.GenerateContentConfig:
+        config_kwargs = {"temperature": temperature}
+
+        # Structured output: the model must return JSON matching this schema
+        if response_schema is not None:
+            config_kwargs["response_mime_type"] = "application/json"
+            config_kwargs["response_schema"] = response_schema
+
+        # Apply thinking configuration if set
+        if self.thinking:
+            config_kwargs["thinking_config"] = types.ThinkingConfig(
+                thinking_level=self.thinking
+            )
+
+        return types.GenerateContentConfig(**config_kwargs)
+
+    def _on_retry(self, span):
+        def log(attempt: int, error: Exception, delay: float):
+            span.attributes["retries"] = attempt
+            print(f"[LLM] {self.model_name} attempt {attempt} failed ({error}); retrying in {delay:.1f}s")
+        return log
 
-    def generate(self, system_prompt: str, user_content: str, temperature: float = 1.0) -> str:
+    def generate(self, system_prompt: str, user_content: str, temperature: float = 1.0, bypass_cache: bool = False) -> str:
         """Generate content using the Gemini API.
-        
+
         Note: Gemini 3 recommends temperature=1.0 (the default).
+        Raises LLMCallError when the call still fails after the pool's retries.
         """
         prompt = f"System: {system_prompt}\n\nUser: {user_content}"
-        try:
-            config_kwargs = {"temperature": temperature}
-
-            # Apply thinking configuration if set
-            if self.thinking:
-                config_kwargs["thinking_config"] = types.ThinkingConfig(
-                    thinking_level=self.thinking
-                )
-
-            response = self.client.models.generate_content(
-                model=self.model_name,
-                contents=prompt,
-                config=types.GenerateContentConfig(**config_kwargs),
+        key = self._cache_key(system_prompt, user_content, temperature)
+        with child_span(f"llm:{self.model_name}", model=self.model_name, thinking=self.thinking) as span:
+            if key and not bypass_cache:
+                cached = self.cache.get(key)
+                span.cache_hit = cached is not None
+                if cached is not None:
+                    return cached
+
+            response = self.pool.call(
+                self.model_name,
+                lambda: self.client.models.generate_content(
+                    model=self.model_name,
+                    contents=prompt,
+                    config=self._build_config(temperature),
+                ),
+                estimated_tokens=estimate_tokens(prompt),
+                on_retry=self._on_retry(span),
             )
+            record_usage(span, response.usage_metadata)
+            if key and response.text:
+                self.cache.put(key, self.model_name, response.text)
             return response.text
-        except Exception as e:
-            return f"Error: {str(e)}"
+
+    async def agenerate(self, system_prompt: str, user_content: str, temperature: float = 1.0,
+                        on_token: Callable[[str], None] | None = None, response_schema=None,
+                        bypass_cache: bool = False, deadline: float | None = None) -> str:
+        """Async counterpart of `generate`, built on the SDK's native asyncio client.
+
+        Awaiting this never blocks the event loop, so many flows can share one process.
+        If `on_token` is given the response is streamed (`generate_content_stream`) and each
+        chunk is handed to it as it arrives; the full text is still returned.
+        `response_schema` (a pydantic model) requests structured JSON output.
+        With the response cache enabled, calls at or below `cache_max_temperature` are served
+        from disk when possible; `bypass_cache` forces a fresh call (the result is still stored).
+        `deadline` (a perf_counter() value, usually `context.deadline`) cancels the request,
+        including any retry backoff, and raises DeadlineExceeded once it passes.
+        Raises LLMCallError when the call still fails after the pool's retries.
+        """
+        prompt = f"System: {system_prompt}\n\nUser: {user_content}"
+        key = self._cache_key(system_prompt, user_content, temperature, response_schema)
+        with child_span(f"llm:{self.model_name}", model=self.model_name, thinking=self.thinking) as span:
+            if key and not bypass_cache:
+                # SQLite lookups block; keep them off the event loop
+                cached = await asyncio.to_thread(self.cache.get, key)
+                span.cache_hit = cached is not None
+                if cached is not None:
+                    if on_token is not None:
+                        on_token(cached)
+                    return cached
+
+            timeout = None if deadline is None else deadline - time.perf_counter()
+            try:
+                if timeout is not None and timeout <= 0:
+                    raise TimeoutError
+                async with asyncio.timeout(timeout):
+                    text, answered_by = await self._agenerate_uncached(span, prompt, temperature, on_token, response_schema)
+            except TimeoutError as e:
+                raise DeadlineExceeded(f"{self.model_name} call cancelled at the query deadline") from e
+            # The key names this client's model; a fallback model's answer must not be served as its own
+            if key and text and answered_by == self.model_name:
+                await asyncio.to_thread(self.cache.put, key, self.model_name, text)
+            return text
+
+    async def _agenerate_uncached(self, span, prompt: str, temperature: float,
+                                  on_token: Callable[[str], None] | None, response_schema) -> tuple[str, str]:
+        """Returns (text, model that produced it); the model differs from ours when a fallback hedge won."""
+        config = self._build_config(temperature, response_schema)
+        estimated = estimate_tokens(prompt)
+        if on_token is None:
+            response, model = await self._generate_hedged(span, prompt, config, estimated)
+            record_usage(span, response.usage_metadata)
+            return response.text, model
+
+        chunks = []
+
+        async def stream_once() -> str:
+            # The slot is held until the stream is drained: the connection stays busy until then
+            stream = await self.client.aio.models.generate_content_stream(
+                model=self.model_name, contents=prompt, config=config,
+            )
+            async for chunk in stream:
+                if chunk.text:
+                    if not chunks:
+                        span.attributes["first_token_at"] = time.time()
+                    chunks.append(chunk.text)
+                    on_token(chunk.text)
+                # Usage arrives on the final chunk
+                if chunk.usage_metadata:
+                    record_usage(span, chunk.usage_metadata)
+            return "".join(chunks)
+
+        # Once tokens have reached the caller a retry would repeat them, so only retry before that
+        text = await self.pool.acall(self.model_name, stream_once, estimated_tokens=estimated,
+                                     can_retry=lambda: not chunks, on_retry=self._on_retry(span))
+        if span.input_tokens is not None:
+            self.pool.limiter(self.model_name).settle(estimated, span.input_tokens + (span.output_tokens or 0))
+        return text, self.model_name
+
+    def _latency_key(self, model: str) -> str:
+        return f"{model}:{self.thinking}"
+
+    async def _generate_once(self, model: str, span, prompt: str, config, estimated: int):
+        start = time.perf_counter()
+        response = await self.pool.acall(
+            model,
+            lambda: self.client.aio.models.generate_content(model=model, contents=prompt, config=config),
+            estimated_tokens=estimated,
+            on_retry=self._on_retry(span),
+        )
+        self.hedge.histogram(self._latency_key(model)).record(time.perf_counter() - start)
+        return response
+
+    async def _generate_hedged(self, span, prompt: str, config, estimated: int):
+        """Send the request; if it outlives the model's hedge percentile, race a duplicate against it.
+
+        The duplicate goes to the policy's fallback model when one is set. The first successful
+        response wins and the other request is cancelled. Streaming calls are never hedged:
+        tokens from two racing streams can't be shown to the user. Returns (response, model that answered).
+        """
+        delay = self.hedge.delay(self._latency_key(self.model_name))
+        if delay is None:
+            return await self._generate_once(self.model_name, span, prompt, config, estimated), self.model_name
+
+        start = time.perf_counter()
+        primary = asyncio.create_task(self._generate_once(self.model_name, span, prompt, config, estimated))
+        tasks = {primary: "primary"}
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done:
+                return primary.result(), self.model_name
+
+            hedge_model = self.hedge.fallback_model or self.model_name
+            tasks[asyncio.create_task(self._generate_once(hedge_model, span, prompt, config, estimated))] = "hedge"
+            self.hedge.hedges_sent += 1
+            span.attributes["hedged_after"] = round(delay, 3)
+            span.attributes["hedge_model"] = hedge_model
+
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        span.attributes["hedge_winner"] = tasks[task]
+                        if tasks[task] == "hedge":
+                            self.hedge.hedges_won += 1
+                            return task.result(), hedge_model
+                        return task.result(), self.model_name
+            return primary.result(), self.model_name  # both failed: surface the primary's error
+        finally:
+            if not primary.done():
+                # The slow calls are the ones that get cancelled; without a sample the percentile
+                # would drift down and hedge ever earlier. Its run time so far is a lower bound.
+                self.hedge.histogram(self._latency_key(self.model_name)).record(time.perf_counter() - start)
+            for task in tasks:
+                task.cancel()
 
 class BrainRegion:
     def __init__(self, name: str, llm: LLMClient):
         self.name = name
         self.llm = llm
+        self._fast_llm = None
+
+    def llm_for(self, context: BrainContext, min_seconds: float) -> LLMClient:
+        """This region's model, or flash with low thinking when less than `min_seconds` of budget is left."""
+        if not context.short_on_time(min_seconds) or (self.llm.model_name == FAST_MODEL and self.llm.thinking == 'low'):
+            return self.llm
+        context.degrade(self.name, f"{context.remaining():.1f}s left, using {FAST_MODEL} (low thinking) instead of {self.llm.model_name}.")
+        return self.fast_llm()
+
+    def fast_llm(self) -> LLMClient:
+        """Flash with low thinking, created on first use."""
+        if self._fast_llm is None:
+            self._fast_llm = LLMClient(model_name=FAST_MODEL, thinking='low')
+        return self._fast_llm
 
-    def process(self, context: BrainContext) -> BrainContext:
+    async def process(self, context: BrainContext) -> BrainContext:
         raise NotImplementedError
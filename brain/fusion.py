@@ -0,0 +1,22 @@
+from typing import Callable, Dict, Hashable, List, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[T]], key: Callable[[T], Hashable] = lambda item: item,
+                           k: int = 60) -> List[Tuple[T, float]]:
+    """Merge ranked lists with RRF: an item scores sum(1 / (k + rank)) over the lists it appears in.
+
+    Items with the same `key` are one item (the first copy seen is kept), so anything several
+    lists agree on rises to the top. Returns (item, score) pairs, best first; ties keep
+    first-seen order.
+    """
+    scores: Dict[Hashable, float] = {}
+    first: Dict[Hashable, T] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, 1):
+            item_key = key(item)
+            first.setdefault(item_key, item)
+            scores[item_key] = scores.get(item_key, 0.0) + 1.0 / (k + rank)
+    order = sorted(first, key=lambda item_key: scores[item_key], reverse=True)
+    return [(first[item_key], scores[item_key]) for item_key in order]
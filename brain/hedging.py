@@ -0,0 +1,85 @@
+import os
+import threading
+from collections import deque
+from typing import Dict, Optional
+from brain.utils import env_flag, percentile
+
+
+class LatencyHistogram:
+    """Sliding window of recent call latencies for one model/thinking combination.
+
+    Successful calls record their latency; a primary cancelled because its hedge won records
+    how long it had run, a lower bound.
+
+    The window (not an all-time histogram) lets the hedge delay follow the API as it speeds
+    up or slows down over the day.
+    """
+
+    def __init__(self, window: int = 500, min_samples: int = 20):
+        self.samples = deque(maxlen=window)
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self.samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """The pct-th percentile, or None until there are enough samples to trust it."""
+        with self._lock:
+            if len(self.samples) < self.min_samples:
+                return None
+            return percentile(list(self.samples), pct)
+
+
+class HedgePolicy:
+    """When to send a duplicate request and where to send it.
+
+    Configured with BRAIN_HEDGE (on/off), BRAIN_HEDGE_PERCENTILE (default 95) and
+    BRAIN_HEDGE_FALLBACK_MODEL (empty = hedge against the same model).
+    """
+
+    def __init__(self, enabled: bool = False, pct: float = 95.0, fallback_model: Optional[str] = None,
+                 min_delay: float = 0.25):
+        self.enabled = enabled
+        self.pct = pct
+        self.fallback_model = fallback_model
+        self.min_delay = min_delay
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+        self.hedges_sent = 0
+        self.hedges_won = 0
+
+    def histogram(self, key: str) -> LatencyHistogram:
+        with self._lock:
+            if key not in self._histograms:
+                self._histograms[key] = LatencyHistogram()
+            return self._histograms[key]
+
+    def delay(self, key: str) -> Optional[float]:
+        """Seconds to wait before hedging a call, or None to not hedge it."""
+        if not self.enabled:
+            return None
+        observed = self.histogram(key).percentile(self.pct)
+        return None if observed is None else max(self.min_delay, observed)
+
+    @classmethod
+    def from_env(cls) -> "HedgePolicy":
+        return cls(
+            enabled=env_flag("BRAIN_HEDGE"),
+            pct=float(os.getenv("BRAIN_HEDGE_PERCENTILE", "95")),
+            fallback_model=os.getenv("BRAIN_HEDGE_FALLBACK_MODEL") or None,
+        )
+
+
+_policy: Optional[HedgePolicy] = None
+_policy_lock = threading.Lock()
+
+
+def get_hedge_policy() -> HedgePolicy:
+    """Process-wide policy, so every LLMClient for a model feeds the same latency histogram."""
+    global _policy
+    with _policy_lock:
+        if _policy is None:
+            _policy = HedgePolicy.from_env()
+        return _policy
@@ -2,111 +2,328 @@ from brain.Prefrontal_Cortex import PrefrontalCortex
 from brain.Hippocampus.memory import Hippocampus
 from brain.Left_Hemisphere.logic import LeftHemisphere
 from brain.Right_Hemisphere.creative import RightHemisphere
-from brain.core import LLMClient
-from brain.schemas import BrainContext
+from brain.core import DeadlineExceeded, LLMClient
+from brain.scheduler import FlowGraph, Stage
+from brain.schemas import BrainContext, MemoryRecall
+from brain.semantic_cache import SemanticAnswerCache
+from brain.tracing import stage_span
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
+import time
+from functools import cached_property
+from typing import Callable
 
 class BrainNetwork:
     def __init__(self):
-        # Each brain region gets a model optimized for its role
-        pfc_llm   = LLMClient(model_name='gemini-3-flash-preview')             # Fast planning & synthesis
-        left_llm  = LLMClient(model_name='gemini-3-pro-preview', thinking='high')    # Deep reasoning
-        right_llm = LLMClient(model_name='gemini-3-pro-preview', thinking='low') # Creative, no deep reasoning
+        # The Hippocampus is built right away only to start loading HippoRAG in the background;
+        # the other regions (and the flows that reference them) are built on first use, so a
+        # cold-start fast-flow query never waits on regions it doesn't touch.
         hippo_llm = LLMClient(model_name='gemini-3-flash-preview')             # Memory retrieval
-
-        self.pfc   = PrefrontalCortex("Prefrontal Cortex", pfc_llm)
         self.hippo = Hippocampus("Hippocampus", hippo_llm)
-        self.left  = LeftHemisphere("Left Hemisphere", left_llm)
-        self.right = RightHemisphere("Right Hemisphere", right_llm)
 
-    async def run_dynamic(self, query: str) -> BrainContext:
-        """Asks the PFC to decide the flow, then executes it."""
-        flow, content = self.pfc.decide_flow(query)
+        # Opt-in (BRAIN_ANSWER_CACHE): near-duplicate auto-mode queries reuse a past final answer
+        self.answer_cache = SemanticAnswerCache.from_env()
+        # Flow graphs by name, each built the first time it runs
+        self._flows: dict[str, FlowGraph] = {}
+
+    # Each brain region gets a model optimized for its role
+    @cached_property
+    def pfc(self) -> PrefrontalCortex:
+        return PrefrontalCortex("Prefrontal Cortex", LLMClient(model_name='gemini-3-flash-preview'))  # Fast planning & synthesis
+
+    @cached_property
+    def left(self) -> LeftHemisphere:
+        return LeftHemisphere("Left Hemisphere", LLMClient(model_name='gemini-3-pro-preview', thinking='high'))  # Deep reasoning
+
+    @cached_property
+    def right(self) -> RightHemisphere:
+        return RightHemisphere("Right Hemisphere", LLMClient(model_name='gemini-3-pro-preview', thinking='low'))  # Creative, no deep reasoning
+
+    def flow(self, name: str) -> FlowGraph:
+        """The named flow's stage graph, built on first use; only the regions it references get built."""
+        if name not in self._flows:
+            builders = {
+                "sequential": self._sequential_flow,
+                "parallel": self._parallel_flow,
+                "logical": self._logical_flow,
+                "creative": self._creative_flow,
+            }
+            self._flows[name] = builders[name]()
+        return self._flows[name]
+
+    # Each flow is declared as a DAG of stages; the scheduler overlaps whatever is independent
+    def _plan_stage(self) -> Stage:
+        return Stage("plan", self.pfc.process, outputs=("plan",))
+
+    def _recall_stage(self) -> Stage:
+        return Stage("recall", self.hippo.process, inputs=("plan",), outputs=("memories",))
+
+    def _search_stage(self) -> Stage:
+        # Memory-first grounding: search waits for recall so a confident recall can skip or shrink it
+        return Stage("search", self.left.search, inputs=("plan", "memories") if self.left.memory_first else ("plan",),
+                     outputs=("search_results",))
+
+    def _reason_stage(self, streams: bool = False) -> Stage:
+        return Stage("reason", self.left.reason, inputs=("plan", "memories", "search_results"), outputs=("logical_facts",),
+                     streams=streams)
+
+    def _index_stage(self) -> Stage:
+        return Stage("index", self._index_search_results, inputs=("search_results",))
+
+    def _sequential_flow(self) -> FlowGraph:
+        """Flow A: The Waterfall"""
+        return FlowGraph("Sequential Flow", [
+            self._plan_stage(), self._recall_stage(), self._search_stage(), self._reason_stage(), self._index_stage(),
+            Stage("create", self.right.process, inputs=("logical_facts",), outputs=("creative_draft", "final_output"), streams=True),
+        ])
+
+    def _parallel_flow(self) -> FlowGraph:
+        """Flow B: The Parallel Council"""
+        return FlowGraph("Parallel Flow", [
+            self._plan_stage(), self._recall_stage(), self._search_stage(), self._reason_stage(), self._index_stage(),
+            Stage("draft", self.right.process, inputs=("plan", "memories"), outputs=("creative_draft",)),
+            Stage("synthesize", self.pfc.process, inputs=("logical_facts", "creative_draft"), outputs=("final_output",), streams=True),
+        ])
+
+    def _logical_flow(self) -> FlowGraph:
+        """Flow C: Pure Logic"""
+        return FlowGraph("Logical Flow", [
+            self._plan_stage(), self._recall_stage(), self._search_stage(), self._index_stage(),
+            # The facts are the answer here, so the reasoning stage itself streams
+            self._reason_stage(streams=True),
+            Stage("conclude", self._conclude_logic, inputs=("logical_facts",), outputs=("final_output",)),
+        ])
+
+    def _creative_flow(self) -> FlowGraph:
+        """Flow D: Pure Creativity"""
+        return FlowGraph("Creative Flow", [
+            self._plan_stage(), self._recall_stage(),
+            Stage("create", self.right.process, inputs=("plan", "memories"), outputs=("creative_draft", "final_output"), streams=True),
+        ])
+
+    async def run_flow(self, name: str, query: str, ctx: BrainContext | None = None) -> BrainContext:
+        """Run any flow `self.flow` knows through the stage scheduler."""
+        flow = self.flow(name)
+        ctx = self._new_context(query, flow.name, ctx)
+        try:
+            return await flow.run(ctx)
+        except DeadlineExceeded:
+            return self._out_of_time(ctx)
+
+    async def run(self, query: str, flow: str = "auto", speculative: bool = False, fused: bool = False,
+                  on_token: Callable[[str], None] | None = None, deadline: float | None = None) -> BrainContext:
+        """Single entry point for callers that pick the flow by name ('auto' lets the PFC decide).
+
+        `deadline` is a latency budget in seconds: stages degrade as it runs short, and
+        calls still in flight when it passes are cancelled.
+        """
+        if flow == "auto":
+            return await self.run_dynamic(query, speculative=speculative, fused=fused, on_token=on_token, deadline=deadline)
+        ctx = self._budgeted_context(query, on_token, deadline)
+        if flow == "fast":
+            return await self.run_fast(query, ctx=ctx)
+        return await self.run_flow(flow, query, ctx)
+
+    async def run_dynamic(self, query: str, speculative: bool = False, fused: bool = False,
+                          on_token: Callable[[str], None] | None = None, deadline: float | None = None) -> BrainContext:
+        """Asks the PFC to decide the flow, then executes it.
+
+        With `speculative=True`, web search and memory retrieval for the raw query start
+        alongside the router call and are handed to the chosen flow (or discarded on 'fast').
+        With `fused=True`, the router also returns the plan in the same call, so the flow's
+        planning stage is skipped. `on_token` receives the final stage's output as it streams.
+        With the semantic answer cache enabled, a close enough past query short-circuits everything.
+        `deadline` is the latency budget in seconds (see `run`).
+        """
+        ctx = self._budgeted_context(query, on_token, deadline)
+        vector = None
+        if self.answer_cache:
+            vector, hit = await self._lookup_answer(ctx)
+            if hit:
+                return ctx
+
+        flow, ctx = await self._dispatch(ctx, speculative, fused)
+        # A degraded or out-of-time answer must not be replayed to later queries that have time to spare
+        degraded = bool(ctx.degradations) or ctx.current_stage == "Deadline Exceeded"
+        if vector is not None and not degraded and self.answer_cache.store(query, vector, flow, ctx.final_output):
+            ctx.add_log("BrainNetwork", "Answer stored in the semantic cache.")
+        return ctx
+
+    async def _lookup_answer(self, ctx: BrainContext) -> tuple[list[float] | None, bool]:
+        """Embed the query and serve a cached answer if a near-duplicate was answered recently."""
+        with stage_span(ctx, "answer_cache", region="BrainNetwork") as span:
+            try:
+                vector = await self.answer_cache.embed(ctx.original_query)
+            except Exception as e:
+                ctx.add_log("BrainNetwork", f"Semantic cache unavailable, running normally: {e}")
+                return None, False
+            match = self.answer_cache.lookup(vector)
+            span.cache_hit = match is not None
+        if match is None:
+            return vector, False
+
+        entry, similarity = match
+        ctx.final_output = entry.final_output
+        ctx.current_stage = "Answer Cache"
+        ctx.add_log("BrainNetwork", f"Served from the semantic cache ({entry.flow} flow, similarity {similarity:.3f} to '{entry.query}').")
+        if ctx.on_token:
+            ctx.emit_token(entry.final_output)
+        return vector, True
+
+    async def _dispatch(self, ctx: BrainContext, speculative: bool, fused: bool) -> tuple[str, BrainContext]:
+        """Route the query (optionally prefetching or fusing the plan) and run the chosen flow."""
+        query = ctx.original_query
+        prefetch = self._start_prefetch(ctx) if speculative else None
+
+        route_start = time.perf_counter()
+        try:
+            with stage_span(ctx, "route", region=self.pfc.router.name) as span:
+                if fused:
+                    flow, content, plan = await self.pfc.route_and_plan(query, ctx.deadline)
+                    if plan and flow != "fast":
+                        # A precomputed plan satisfies the flow's 'plan' stage
+                        ctx.plan = plan
+                        ctx.add_log(self.pfc.planner.name, "Plan Generated (fused with routing):\n" + "\n".join(f"- {step}" for step in plan))
+                else:
+                    flow, content = await self.pfc.decide_flow(query, ctx.deadline)
+                span.attributes["flow"] = flow
+        except DeadlineExceeded:
+            if prefetch:
+                for task in prefetch.values():
+                    task.cancel()
+                await asyncio.gather(*prefetch.values(), return_exceptions=True)
+            return "none", self._out_of_time(ctx)
+        route_time = time.perf_counter() - route_start
+        ctx.stage_timings["route"] = route_time
+
+        if prefetch:
+            await self._finish_prefetch(ctx, flow, prefetch, route_time)
         
         if flow == "fast":
             # Pass the pre-generated content to run_fast
-            return self.run_fast(query, content)
+            ctx = await self.run_fast(query, content, ctx)
         elif flow == "logical":
-            return self.run_logical(query)
+            ctx = await self.run_logical(query, ctx)
         elif flow == "creative":
-            return self.run_creative(query)
+            ctx = await self.run_creative(query, ctx)
         elif flow == "parallel":
-            # Parallel is async
-            return await self.run_parallel(query)
+            ctx = await self.run_parallel(query, ctx)
         else:
             # Default to sequential
-            return self.run_sequential(query)
+            ctx = await self.run_sequential(query, ctx)
+        return flow, ctx
+
+    def _budgeted_context(self, query: str, on_token: Callable[[str], None] | None, deadline: float | None) -> BrainContext:
+        ctx = BrainContext(original_query=query, on_token=on_token)
+        if deadline is not None:
+            ctx.deadline = ctx.started_at + deadline
+        return ctx
+
+    def _out_of_time(self, ctx: BrainContext) -> BrainContext:
+        """The deadline cancelled a stage: answer with the most complete output produced so far."""
+        partial = ctx.final_output or ctx.creative_draft or ("\n".join(ctx.logical_facts) if ctx.logical_facts else None)
+        ctx.final_output = partial or "I ran out of time before an answer was ready. Please try again with a longer deadline."
+        ctx.degrade("BrainNetwork", f"Deadline exceeded during '{ctx.current_stage}'; returning {'partial output' if partial else 'a fallback message'}.")
+        ctx.current_stage = "Deadline Exceeded"
+        return ctx
+
+    def _new_context(self, query: str, stage: str, ctx: BrainContext | None = None) -> BrainContext:
+        """Start a fresh context, or continue one seeded by run_dynamic (e.g. with prefetched data)."""
+        if ctx is None:
+            return BrainContext(original_query=query, current_stage=stage)
+        ctx.current_stage = stage
+        return ctx
+
+    def _start_prefetch(self, ctx: BrainContext) -> dict:
+        """Kick off the router-independent work of every non-fast flow."""
+        async def timed(name, region, coro):
+            start = time.perf_counter()
+            with stage_span(ctx, f"prefetch:{name}", region=region):
+                result = await coro
+            return result, time.perf_counter() - start
+
+        query = ctx.original_query
+        tasks = {"memories": asyncio.create_task(timed("memories", self.hippo.name, self.hippo.recall_scored(query)))}
+        # In memory-first mode the recall decides whether to search at all, so don't search speculatively
+        if self.left.search_client.is_available and not self.left.memory_first:
+            tasks["search_results"] = asyncio.create_task(timed("search_results", self.left.name, self.left.search_web(query, context=ctx)))
+        return tasks
+
+    async def _finish_prefetch(self, ctx: BrainContext, flow: str, tasks: dict, route_time: float):
+        """Seed the context with speculative results, or cancel them for the fast flow."""
+        if flow == "fast":
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            ctx.add_log("BrainNetwork", "Speculative prefetch discarded (fast flow).")
+            return
+
+        saved = 0.0
+        for field, task in tasks.items():
+            try:
+                # Don't let a slow prefetch eat the whole budget; the stage re-checks what is left
+                result, elapsed = await asyncio.wait_for(task, ctx.stage_timeout(0.5))
+            except asyncio.TimeoutError:
+                ctx.degrade("BrainNetwork", f"Speculative {field} prefetch cancelled at its share of the deadline.")
+                continue
+            except Exception as e:
+                ctx.add_log("BrainNetwork", f"Speculative {field} prefetch failed, stage will run normally: {e}")
+                continue
+            if isinstance(result, MemoryRecall):
+                result.apply(ctx)
+            else:
+                setattr(ctx, field, result)
+            # Only the part that overlapped the router call is time the flow no longer waits for;
+            # the prefetches ran side by side, so the longest overlap is the saving, not their sum
+            saved = max(saved, min(elapsed, route_time))
+
+        ctx.add_log("BrainNetwork", f"Speculative prefetch saved ~{saved:.2f}s (router took {route_time:.2f}s).")
 
-    def run_fast(self, query: str, content: str = None) -> BrainContext:
+    async def run_fast(self, query: str, content: str = None, ctx: BrainContext | None = None) -> BrainContext:
         """Flow E: Fast / Trivial"""
-        ctx = BrainContext(original_query=query, current_stage="Fast Flow")
+        ctx = self._new_context(query, "Fast Flow", ctx)
         # Reuse quick_reply but passing the content if we have it
-        ctx = self.pfc.quick_reply(ctx, content) 
+        try:
+            with stage_span(ctx, "quick_reply", region=self.pfc.router.name):
+                ctx = await self.pfc.quick_reply(ctx, content) 
+        except DeadlineExceeded:
+            return self._out_of_time(ctx)
         return ctx
 
-    def run_sequential(self, query: str) -> BrainContext:
+    async def run_sequential(self, query: str, ctx: BrainContext | None = None) -> BrainContext:
         """Flow A: The Waterfall"""
-        ctx = BrainContext(original_query=query, current_stage="Sequential Flow")
-        ctx = self.pfc.process(ctx)
-        ctx = self.hippo.process(ctx)
-        ctx = self.left.process(ctx)
-        self._index_search_results(ctx)
-        ctx = self.right.process(ctx)
-        return ctx
+        return await self.run_flow("sequential", query, ctx)
 
-    def run_logical(self, query: str) -> BrainContext:
+    async def run_logical(self, query: str, ctx: BrainContext | None = None) -> BrainContext:
         """Flow C: Pure Logic"""
-        ctx = BrainContext(original_query=query, current_stage="Logical Flow")
-        ctx = self.pfc.process(ctx)
-        ctx = self.hippo.process(ctx)
-        ctx = self.left.process(ctx)
-        self._index_search_results(ctx)
-        
-        # Final output is the Logical facts joined
-        ctx.final_output = "\n".join(ctx.logical_facts) if ctx.logical_facts else "No logical output generated."
-        return ctx
+        return await self.run_flow("logical", query, ctx)
 
-    def run_creative(self, query: str) -> BrainContext:
+    async def run_creative(self, query: str, ctx: BrainContext | None = None) -> BrainContext:
         """Flow D: Pure Creativity"""
-        ctx = BrainContext(original_query=query, current_stage="Creative Flow")
-        ctx = self.pfc.process(ctx)
-        ctx = self.hippo.process(ctx)
-        ctx = self.right.process(ctx)
-        return ctx
+        return await self.run_flow("creative", query, ctx)
 
-    async def run_parallel(self, query: str) -> BrainContext:
+    async def run_parallel(self, query: str, ctx: BrainContext | None = None) -> BrainContext:
         """Flow B: The Parallel Council"""
-        ctx = BrainContext(original_query=query, current_stage="Parallel Flow")
-        
-        ctx = self.pfc.process(ctx)
-        ctx = self.hippo.process(ctx)
-        
-        with ThreadPoolExecutor() as executor:
-            loop = asyncio.get_event_loop()
-            t1 = loop.run_in_executor(executor, self.left.process, ctx.model_copy(deep=True))
-            t2 = loop.run_in_executor(executor, self.right.process, ctx.model_copy(deep=True))
-            
-            ctx_left, ctx_right = await asyncio.gather(t1, t2)
-            
-        ctx.logical_facts = ctx_left.logical_facts
-        ctx.search_results = ctx_left.search_results
-        ctx.creative_draft = ctx_right.creative_draft
-        ctx.logs.extend(ctx_left.logs)
-        ctx.logs.extend(ctx_right.logs)
-        
-        # Index search results discovered during parallel processing
-        self._index_search_results(ctx)
-        
-        # PFC Synthesis
-        ctx = self.pfc.process(ctx)
+        return await self.run_flow("parallel", query, ctx)
+
+    async def _conclude_logic(self, ctx: BrainContext) -> BrainContext:
+        # Final output is the Logical facts joined
+        ctx.final_output = "\n".join(ctx.logical_facts) if ctx.logical_facts else "No logical output generated."
         return ctx
 
-    def _index_search_results(self, ctx: BrainContext):
-        """Index Tavily search results into HippoRAG for long-term memory."""
+    async def _index_search_results(self, ctx: BrainContext) -> BrainContext:
+        """Queue Tavily search results for indexing into HippoRAG (long-term memory)."""
         if ctx.search_results:
             try:
-                self.hippo.index_search_results(ctx.search_results)
-                ctx.add_log("BrainNetwork", f"Indexed {len(ctx.search_results)} search results into long-term memory.")
+                accepted, skipped = await asyncio.to_thread(self.hippo.queue_search_results, ctx.search_results)
+                if self.hippo.index_queue is None:
+                    ctx.add_log("BrainNetwork", f"Indexed {accepted} search results into long-term memory ({skipped} duplicates or empty skipped).")
+                else:
+                    ctx.add_log("BrainNetwork", f"Queued {accepted} search results for indexing ({skipped} duplicates or empty skipped, "
+                                                f"{self.hippo.index_queue.pending} pending).")
             except Exception as e:
                 ctx.add_log("BrainNetwork", f"Failed to index search results: {e}")
+        return ctx
+
+    def close(self):
+        """Flush background work (pending memory indexing) before the process exits."""
+        self.hippo.close()
@@ -0,0 +1,124 @@
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+from brain.rate_limit import estimate_tokens
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "how", "in", "is", "it", "of", "on",
+    "or", "that", "the", "this", "to", "was", "what", "when", "where", "which", "who", "why", "with",
+}
+
+
+def _terms(text: str) -> List[str]:
+    return [word for word in _WORD_RE.findall(text.lower()) if word not in _STOPWORDS]
+
+
+@dataclass
+class PackResult:
+    sections: Dict[str, List[str]]
+    tokens: int = 0
+    duplicates: int = 0
+    dropped: int = 0
+    scores: Dict[str, List[float]] = field(default_factory=dict)
+
+    def summary(self) -> str:
+        kept = sum(len(items) for items in self.sections.values())
+        return f"packed {kept} items in ~{self.tokens} tokens ({self.duplicates} duplicates, {self.dropped} over budget dropped)"
+
+
+class PromptPacker:
+    """Fits region inputs (memories, search results, facts...) into a token budget.
+
+    `pack` takes named sections of text items in priority order and:
+      1. drops near-duplicates across and within sections (word-set Jaccard, or one item
+         contained in another), keeping the copy from the earlier section;
+      2. scores every item against the query with a BM25-style term overlap;
+      3. keeps the best-scoring items while they fit the budget; an item that doesn't fit is
+         skipped (a smaller, less relevant one may still fit) rather than cut mid-sentence;
+      4. returns each section's survivors ordered by relevance, except sections listed in
+         `keep_order` (e.g. step-by-step facts), which keep their original order.
+    """
+
+    def __init__(self, budget_tokens: int, duplicate_threshold: float = 0.8):
+        self.budget_tokens = budget_tokens
+        self.duplicate_threshold = duplicate_threshold
+
+    def pack(self, query: str, sections: Dict[str, Optional[List[str]]], reserved_tokens: int = 0,
+             keep_order: Iterable[str] = ()) -> PackResult:
+        budget = max(0, self.budget_tokens - reserved_tokens)
+        result = PackResult(sections={name: [] for name in sections})
+
+        # 1. Deduplicate, earlier sections win
+        items, seen = [], []
+        for name, texts in sections.items():
+            for text in texts or []:
+                text = text.strip()
+                if not text:
+                    continue
+                words = _terms(text)
+                entry = (f" {' '.join(words)} ", set(words))
+                if any(self._is_duplicate(entry, other) for other in seen):
+                    result.duplicates += 1
+                    continue
+                seen.append(entry)
+                items.append((name, text))
+
+        # 2. Score against the query (BM25-style: idf-weighted term overlap with length normalisation)
+        query_terms = set(_terms(query))
+        doc_terms = [Counter(_terms(text)) for _, text in items]
+        doc_freq = Counter(term for counts in doc_terms for term in counts.keys() & query_terms)
+        avg_len = sum(sum(c.values()) for c in doc_terms) / len(doc_terms) if doc_terms else 1.0
+        scores = []
+        for counts in doc_terms:
+            length = sum(counts.values()) or 1
+            score = 0.0
+            for term in query_terms & counts.keys():
+                df = doc_freq[term]
+                idf = math.log(1 + (len(doc_terms) - df + 0.5) / (df + 0.5))
+                tf = counts[term]
+                score += idf * tf * 2.2 / (tf + 1.2 * (0.25 + 0.75 * length / (avg_len or 1)))
+            scores.append(score)
+
+        # 3. Greedy fill by relevance
+        order = sorted(range(len(items)), key=lambda i: scores[i], reverse=True)
+        kept = set()
+        for i in order:
+            cost = estimate_tokens(items[i][1])
+            if result.tokens + cost > budget:
+                result.dropped += 1
+                continue
+            kept.add(i)
+            result.tokens += cost
+
+        # 4. Survivors per section, most relevant first
+        keep_order = set(keep_order)
+        for i in order:
+            if i in kept and items[i][0] not in keep_order:
+                name, text = items[i]
+                result.sections[name].append(text)
+                result.scores.setdefault(name, []).append(round(scores[i], 3))
+        for i in sorted(kept):
+            name, text = items[i]
+            if name in keep_order:
+                result.sections[name].append(text)
+                result.scores.setdefault(name, []).append(round(scores[i], 3))
+        result.tokens += reserved_tokens
+        return result
+
+    def _is_duplicate(self, entry: tuple, other: tuple) -> bool:
+        """`entry`/`other` are (space-padded normalised words, word set)."""
+        (joined, terms), (other_joined, other_terms) = entry, other
+        if not terms or not other_terms:
+            return joined == other_joined
+        if len(terms & other_terms) / len(terms | other_terms) >= self.duplicate_threshold:
+            return True
+        shorter, longer = sorted((joined, other_joined), key=len)
+        return shorter in longer
+
+
+def format_bullets(items: Optional[List[str]], empty: str = "None.") -> str:
+    """Render a list as '- item' lines instead of a Python repr."""
+    return "\n".join(f"- {item}" for item in items) if items else empty
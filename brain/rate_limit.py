@@ -0,0 +1,134 @@
+import random
+import re
+import threading
+import time
+from typing import Dict, Optional, Tuple
+import httpx
+from google.genai import errors as genai_errors
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class LLMCallError(RuntimeError):
+    """An LLM call that still failed after every retry (or failed in a way retrying can't fix)."""
+
+    def __init__(self, model: str, attempts: int, cause: Exception):
+        self.model = model
+        self.attempts = attempts
+        self.cause = cause
+        self.status = getattr(cause, "code", None)
+        super().__init__(f"{model} failed after {attempts} attempt(s): {cause}")
+
+
+def parse_rate_limits(spec: str) -> Dict[str, Tuple[Optional[int], Optional[int]]]:
+    """Parse 'gemini-3-pro-preview=25:1000000,default=60:' into {model: (rpm, tpm)}; empty means unlimited."""
+    limits = {}
+    for item in spec.split(","):
+        model, _, value = item.partition("=")
+        if not model.strip() or not value.strip():
+            continue
+        rpm, _, tpm = value.partition(":")
+        limits[model.strip()] = (int(rpm) if rpm.strip() else None, int(tpm) if tpm.strip() else None)
+    return limits
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at `per_minute` / 60 per second.
+
+    `reserve` debits immediately (the balance may go negative) and returns how long the
+    caller must wait before its share is actually available, so callers queue in order
+    without polling.
+    """
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float) -> float:
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+        return max(0.0, -self.tokens / self.rate)
+
+    def adjust(self, delta: float):
+        self._refill()
+        self.tokens -= delta
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute buckets for one model, safe across threads."""
+
+    def __init__(self, rpm: Optional[int] = None, tpm: Optional[int] = None):
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.token_bucket = TokenBucket(tpm) if tpm else None
+        self._lock = threading.Lock()
+
+    def reserve(self, estimated_tokens: int) -> float:
+        with self._lock:
+            wait = self.requests.reserve(1) if self.requests else 0.0
+            if self.token_bucket and estimated_tokens:
+                wait = max(wait, self.token_bucket.reserve(estimated_tokens))
+            return wait
+
+    def settle(self, estimated_tokens: int, actual_tokens: Optional[int]):
+        """Correct the token bucket once the real usage is known."""
+        if self.token_bucket and actual_tokens is not None:
+            with self._lock:
+                self.token_bucket.adjust(actual_tokens - estimated_tokens)
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English); exact counts would cost an API call.
+
+    The one estimate used everywhere, so prompt budgets and rate-limit reservations agree.
+    """
+    return len(text) // 4 + 1
+
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, genai_errors.APIError):
+        return error.code in RETRYABLE_STATUS
+    return isinstance(error, (httpx.TransportError, TimeoutError, ConnectionError))
+
+
+def _find_retry_delay(node) -> Optional[str]:
+    if isinstance(node, dict):
+        if "retryDelay" in node:
+            return node["retryDelay"]
+        node = list(node.values())
+    if isinstance(node, list):
+        for child in node:
+            found = _find_retry_delay(child)
+            if found:
+                return found
+    return None
+
+
+def retry_hint(error: Exception) -> Optional[float]:
+    """Seconds the server asked us to wait: a RetryInfo `retryDelay` in the body or a Retry-After header."""
+    delay = _find_retry_delay(getattr(error, "details", None))
+    if delay:
+        match = re.match(r"([\d.]+)s", str(delay))
+        if match:
+            return float(match.group(1))
+    response = getattr(error, "response", None)
+    header = getattr(response, "headers", {}).get("retry-after") if response is not None else None
+    try:
+        return float(header) if header else None
+    except ValueError:
+        return None
+
+
+def backoff_delay(attempt: int, error: Exception, base: float = 1.0, cap: float = 60.0) -> float:
+    """Full-jitter exponential backoff, but never shorter than the server's retry hint."""
+    delay = random.uniform(0, min(cap, base * 2 ** attempt))
+    hint = retry_hint(error)
+    if hint is not None:
+        delay = max(delay, hint + random.uniform(0, base))
+    return delay
@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+from brain.utils import env_path, state_path
+
+DEFAULT_CACHE_PATH = state_path("llm_cache", "responses.sqlite")
+
+
+def cache_key(model: str, thinking: Optional[str], temperature: float, system_prompt: str, user_content: str,
+              response_schema=None) -> str:
+    schema = getattr(response_schema, "__name__", None) if response_schema is not None else None
+    key = json.dumps([model, thinking, temperature, system_prompt, user_content, schema], ensure_ascii=False)
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed LLM response cache with a TTL and least-recently-used eviction.
+
+    Modelled on HippoRAG's CacheOpenAI, but shared by every LLMClient. Entries older than
+    `ttl` seconds are treated as misses; once more than `max_entries` are stored, the least
+    recently read ones are dropped. SQLite's own locking keeps concurrent processes safe.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_entries: int = 10000, ttl: float = 7 * 24 * 3600):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                response TEXT,
+                created_at REAL,
+                last_used REAL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT response, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                if row is not None:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, model: str, response: str):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, model, response, now, now),
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_used LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """The shared cache, or None unless BRAIN_LLM_CACHE is set ('1' for the default path, or a file path)."""
+    global _cache
+    path = env_path("BRAIN_LLM_CACHE", DEFAULT_CACHE_PATH, default_on=False)
+    if path is None:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache(
+                path,
+                max_entries=int(os.getenv("BRAIN_LLM_CACHE_MAX_ENTRIES", "10000")),
+                ttl=float(os.getenv("BRAIN_LLM_CACHE_TTL", str(7 * 24 * 3600))),
+            )
+        return _cache
@@ -0,0 +1,114 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Tuple
+from brain.schemas import BrainContext
+from brain.tracing import stage_span
+
+# BrainContext fields that stages exchange. Everything else (logs, metadata) is shared as-is.
+DATA_FIELDS = ("plan", "memories", "search_results", "logical_facts", "creative_draft", "final_output")
+
+
+@dataclass
+class Stage:
+    """One node of a flow: an async step that reads `inputs` and writes `outputs` on the context.
+
+    `streams` marks the stage that produces the user-facing answer; only it gets the token sink.
+    """
+    name: str
+    run: Callable[[BrainContext], Awaitable[BrainContext]]
+    inputs: Tuple[str, ...] = ()
+    outputs: Tuple[str, ...] = ()
+    streams: bool = False
+
+
+class FlowGraph:
+    """A flow declared as a DAG of stages, wired together by the context fields they exchange.
+
+    A stage becomes ready once every stage producing one of its inputs has finished, and all
+    ready stages run concurrently. Each stage only sees its declared inputs (other data fields
+    are blanked on its view of the context) and only its declared outputs are merged back, so
+    concurrent stages can't observe each other's half-finished work.
+    """
+
+    def __init__(self, name: str, stages: List[Stage]):
+        self.name = name
+        self.stages = {stage.name: stage for stage in stages}
+        self.producers: Dict[str, List[str]] = {}
+        for stage in stages:
+            for field in stage.inputs + stage.outputs:
+                if field not in DATA_FIELDS:
+                    raise ValueError(f"Stage '{stage.name}' uses unknown context field '{field}'.")
+            for field in stage.outputs:
+                self.producers.setdefault(field, []).append(stage.name)
+
+        self.depends_on = {
+            stage.name: {p for field in stage.inputs for p in self.producers.get(field, []) if p != stage.name}
+            for stage in stages
+        }
+        self._check_acyclic()
+
+    def _check_acyclic(self):
+        done, remaining = set(), dict(self.depends_on)
+        while remaining:
+            ready = [name for name, deps in remaining.items() if deps <= done]
+            if not ready:
+                raise ValueError(f"Flow '{self.name}' has a dependency cycle between: {sorted(remaining)}")
+            for name in ready:
+                done.add(name)
+                del remaining[name]
+
+    async def run(self, ctx: BrainContext) -> BrainContext:
+        done, running = set(), {}
+        pending = dict(self.depends_on)
+
+        # Stages whose outputs were seeded upfront (prefetch, precomputed plan) are already satisfied
+        for name in list(pending):
+            outputs = self.stages[name].outputs
+            if outputs and all(getattr(ctx, field) is not None for field in outputs):
+                ctx.add_log("Scheduler", f"Skipping '{name}': {', '.join(outputs)} already available.")
+                done.add(name)
+                del pending[name]
+
+        try:
+            while pending or running:
+                for name in [n for n, deps in pending.items() if deps <= done]:
+                    del pending[name]
+                    running[asyncio.create_task(self._run_stage(self.stages[name], ctx))] = name
+
+                finished, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    name = running.pop(task)
+                    task.result()  # re-raise stage errors
+                    done.add(name)
+        finally:
+            for task in running:
+                task.cancel()
+            # Let cancelled stages unwind (close spans, release slots) before the caller moves on
+            await asyncio.gather(*running, return_exceptions=True)
+
+        return ctx
+
+    async def _run_stage(self, stage: Stage, ctx: BrainContext):
+        hidden = {field: None for field in DATA_FIELDS if field not in stage.inputs}
+        if not stage.streams:
+            hidden["on_token"] = None
+        # Shallow copy: logs and other metadata stay shared with the parent context
+        view = ctx.model_copy(update=hidden)
+        metadata = {field: getattr(view, field) for field in type(ctx).model_fields
+                    if field not in DATA_FIELDS and field not in hidden}
+
+        # Bound region methods carry the region's display name
+        region = getattr(getattr(stage.run, "__self__", None), "name", None)
+        stage_start = time.perf_counter()
+        with stage_span(ctx, stage.name, region=region):
+            view = await stage.run(view)
+        ctx.stage_timings[stage.name] = time.perf_counter() - stage_start
+
+        for field in stage.outputs:
+            setattr(ctx, field, getattr(view, field))
+        # Carry back metadata the stage replaced (current_stage, time_to_first_token, ...)
+        for field, before in metadata.items():
+            after = getattr(view, field)
+            if after is not before:
+                setattr(ctx, field, after)
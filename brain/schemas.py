@@ -1,11 +1,35 @@
+import time
+import uuid
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Literal
+from typing import Any, Callable, List, Optional, Dict, Literal
+
+class Span(BaseModel):
+    """One timed unit of work (a stage, an LLM call, a HippoRAG phase) within a query's trace."""
+    span_id: str = Field(default_factory=lambda: uuid.uuid4().hex[:16])
+    parent_id: Optional[str] = None
+    name: str
+    region: Optional[str] = None
+    model: Optional[str] = None
+    thinking: Optional[str] = None
+    start: float = Field(default_factory=time.time, description="Unix seconds")
+    end: Optional[float] = None
+    input_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+    cache_hit: Optional[bool] = None
+    error: Optional[str] = None
+    attributes: Dict[str, Any] = Field(default_factory=dict)
+
+    @property
+    def duration(self) -> Optional[float]:
+        return None if self.end is None else self.end - self.start
 
 class BrainContext(BaseModel):
     """Shared state object passed between brain regions."""
     original_query: str
     plan: Optional[List[str]] = Field(default=None, description="Steps generated by PFC")
     memories: Optional[List[str]] = Field(default=None, description="Context from Hippocampus")
+    memory_scores: Optional[List[float]] = Field(default=None, description="HippoRAG retrieval scores, one per memory")
+    memory_confidence: Optional[float] = Field(default=None, description="Best query-to-memory cosine similarity (recall confidence)")
     search_results: Optional[List[Dict[str, str]]] = Field(default=None, description="Web search results from Tavily")
     logical_facts: Optional[List[str]] = Field(default=None, description="Facts from Left Brain")
     creative_draft: Optional[str] = Field(default=None, description="Draft from Right Brain")
@@ -14,8 +38,71 @@ class BrainContext(BaseModel):
     # Metadata for tracking the process
     current_stage: str = "Input"
     logs: List[str] = Field(default_factory=list)
+    started_at: float = Field(default_factory=time.perf_counter, description="perf_counter() when the query arrived")
+    stage_timings: Dict[str, float] = Field(default_factory=dict, description="Wall-clock seconds per stage")
+    trace_id: str = Field(default_factory=lambda: uuid.uuid4().hex)
+    spans: List[Span] = Field(default_factory=list, description="Structured trace, see brain.tracing")
+
+    # Latency budget: stages check the remaining time and take cheaper paths when it runs short
+    deadline: Optional[float] = Field(default=None, description="perf_counter() by which the answer is due (None = no limit)")
+    degradations: List[str] = Field(default_factory=list, description="Shortcuts taken to stay within the deadline")
+
+    # Streaming: receives the final stage's tokens as they arrive
+    on_token: Optional[Callable[[str], None]] = Field(default=None, exclude=True)
+    time_to_first_token: Optional[float] = Field(default=None, description="Seconds from query start to the first streamed token")
 
     def add_log(self, source: str, message: str):
         # Print immediately for real-time user feedback
         print(f"[{source}] {message}")
         self.logs.append(f"[{source}] {message}")
+
+    def emit_token(self, text: str):
+        if self.time_to_first_token is None:
+            self.time_to_first_token = time.perf_counter() - self.started_at
+        if self.on_token:
+            self.on_token(text)
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left before the deadline, or None when the query has no deadline."""
+        return None if self.deadline is None else self.deadline - time.perf_counter()
+
+    def short_on_time(self, seconds: float) -> bool:
+        remaining = self.remaining()
+        return remaining is not None and remaining < seconds
+
+    def stage_timeout(self, fraction: float = 1.0) -> Optional[float]:
+        """Timeout for a stage allowed to use `fraction` of the remaining budget (None = no limit)."""
+        remaining = self.remaining()
+        return None if remaining is None else max(0.0, remaining * fraction)
+
+    def degrade(self, source: str, message: str):
+        self.degradations.append(f"[{source}] {message}")
+        self.add_log(source, f"[Deadline] {message}")
+
+    def token_sink(self) -> Optional[Callable[[str], None]]:
+        """The callback a region should stream into, or None when nobody is listening."""
+        return self.emit_token if self.on_token else None
+
+class CascadeDraft(BaseModel):
+    """Structured output of the Left Hemisphere's fast first pass in cascade mode."""
+    facts: List[str]
+    confidence: float = Field(description="Self-assessed probability (0-1) that the facts are correct and complete")
+
+class MemoryRecall(BaseModel):
+    """Memories retrieved for one query, with HippoRAG's scores and how closely the best one matches the query."""
+    docs: List[str] = Field(default_factory=list)
+    scores: List[float] = Field(default_factory=list)
+    confidence: Optional[float] = None
+    # False when the deadline forced dense-only ranking (no recognition-memory rerank, no PPR)
+    reranked: bool = True
+
+    def apply(self, context: BrainContext):
+        context.memories = self.docs
+        context.memory_scores = self.scores
+        context.memory_confidence = self.confidence
+
+class RoutingDecision(BaseModel):
+    """Structured output of the fused PFC routing-and-planning call."""
+    flow: str
+    content: Optional[str] = None
+    plan: Optional[List[str]] = None
@@ -0,0 +1,118 @@
+import math
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional, Set, Tuple
+from brain.client_pool import get_pool
+from brain.rate_limit import estimate_tokens
+from brain.utils import env_flag
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+DEFAULT_EMBEDDING_MODEL = "models/text-embedding-004"
+
+
+@dataclass
+class CachedAnswer:
+    query: str
+    flow: str
+    final_output: str
+    vector: List[float]
+    created_at: float
+
+
+def _normalize(vector: List[float]) -> List[float]:
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+
+class SemanticAnswerCache:
+    """In-memory nearest-neighbour cache of final answers, keyed by query embedding.
+
+    A new query is embedded once and compared (cosine) against every cached query; the best
+    match above `threshold` is served if it hasn't outlived `ttl`. Entries are evicted
+    least-recently-used beyond `max_entries`, and flows in `skip_flows` (e.g. 'creative',
+    where a fresh answer is the point) are never stored.
+    """
+
+    def __init__(self, threshold: float = 0.9, ttl: float = 3600.0, max_entries: int = 1000,
+                 skip_flows: Optional[Set[str]] = None, embedding_model: str = DEFAULT_EMBEDDING_MODEL):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.skip_flows = set(skip_flows or ())
+        self.embedding_model = embedding_model
+        self.pool = get_pool()
+        self.entries: "OrderedDict[str, CachedAnswer]" = OrderedDict()
+        self._matrix = None  # stacked vectors, rebuilt lazily after inserts/evictions
+        self._keys: List[str] = []
+        self.hits = 0
+        self.misses = 0
+
+    async def embed(self, query: str) -> List[float]:
+        result = await self.pool.acall(
+            self.embedding_model,
+            lambda: self.pool.client.aio.models.embed_content(model=self.embedding_model, contents=[query]),
+            estimated_tokens=estimate_tokens(query),
+        )
+        return _normalize(list(result.embeddings[0].values))
+
+    def _similarities(self, vector: List[float]) -> Tuple[List[str], List[float]]:
+        # Rows are keyed by a snapshot of the keys, so LRU reordering on a hit doesn't force a rebuild
+        if self._matrix is None:
+            self._keys = list(self.entries)
+            vectors = [self.entries[key].vector for key in self._keys]
+            self._matrix = np.asarray(vectors, dtype=np.float32) if np is not None else vectors
+        if np is None:
+            return self._keys, [sum(a * b for a, b in zip(vector, other)) for other in self._matrix]
+        return self._keys, (self._matrix @ np.asarray(vector, dtype=np.float32)).tolist()
+
+    def lookup(self, vector: List[float]) -> Optional[Tuple[CachedAnswer, float]]:
+        """Best live entry at or above the threshold, as (entry, similarity)."""
+        self._expire()
+        if not self.entries:
+            self.misses += 1
+            return None
+        keys, scores = self._similarities(vector)
+        best = max(range(len(scores)), key=scores.__getitem__)
+        if scores[best] < self.threshold:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(keys[best])
+        self.hits += 1
+        return self.entries[keys[best]], scores[best]
+
+    def store(self, query: str, vector: List[float], flow: str, final_output: Optional[str]) -> bool:
+        if flow in self.skip_flows or not final_output:
+            return False
+        self.entries[query] = CachedAnswer(query, flow, final_output, vector, time.time())
+        self.entries.move_to_end(query)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        self._matrix = None
+        return True
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl
+        stale = [key for key, entry in self.entries.items() if entry.created_at < cutoff]
+        for key in stale:
+            del self.entries[key]
+        if stale:
+            self._matrix = None
+
+    @classmethod
+    def from_env(cls) -> Optional["SemanticAnswerCache"]:
+        """Built only when BRAIN_ANSWER_CACHE is set; thresholds and limits come from BRAIN_ANSWER_CACHE_*."""
+        if not env_flag("BRAIN_ANSWER_CACHE"):
+            return None
+        return cls(
+            threshold=float(os.getenv("BRAIN_ANSWER_CACHE_THRESHOLD", "0.9")),
+            ttl=float(os.getenv("BRAIN_ANSWER_CACHE_TTL", "3600")),
+            max_entries=int(os.getenv("BRAIN_ANSWER_CACHE_MAX_ENTRIES", "1000")),
+            skip_flows={f.strip() for f in os.getenv("BRAIN_ANSWER_CACHE_SKIP_FLOWS", "creative").split(",") if f.strip()},
+            embedding_model=os.getenv("BRAIN_EMBEDDING_MODEL", DEFAULT_EMBEDDING_MODEL),
+        )
@@ -0,0 +1,223 @@
+import asyncio
+import http.client
+import json
+import os
+import socket
+import time
+from http import HTTPStatus
+from brain.network import BrainNetwork
+from brain.tracing import write_trace
+
+FLOWS = ["auto", "sequential", "parallel", "logical", "creative", "fast"]
+
+
+class BrainServer:
+    """Serves one warm BrainNetwork over HTTP/JSON on a TCP port and, optionally, a Unix socket.
+
+    Endpoints:
+        GET  /healthz → 200 once the network is built, 503 while it is still loading.
+        POST /query   → body {"query": str, "flow": str = "auto", "speculative": bool = false, "fused": bool = false,
+                              "deadline": float | null (seconds)},
+                        returns the final BrainContext as JSON.
+
+    Every connection is handled in its own coroutine and flows are fully async, so concurrent
+    requests share the same clients and HippoRAG stores instead of rebuilding them.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, socket_path: str | None = None,
+                 trace_dir: str | None = None, trace_format: str = "chrome"):
+        self.host = host
+        self.port = port
+        self.socket_path = socket_path
+        self.trace_dir = trace_dir
+        self.trace_format = trace_format
+        self.network: BrainNetwork | None = None
+        self.load_error: str | None = None
+        self.started_at = time.time()
+        self.in_flight = 0
+        self.served = 0
+
+    async def serve_forever(self):
+        servers = [await asyncio.start_server(self._handle, self.host, self.port)]
+        print(f"[Server] Listening on http://{self.host}:{self.port}")
+        if self.socket_path:
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+            servers.append(await asyncio.start_unix_server(self._handle, path=self.socket_path))
+            print(f"[Server] Listening on unix:{self.socket_path}")
+
+        # Accept connections right away; /healthz reports 503 until the brain is warm
+        loader = asyncio.create_task(self._load_network())
+        try:
+            await asyncio.gather(*(server.serve_forever() for server in servers))
+        finally:
+            loader.cancel()
+            for server in servers:
+                server.close()
+            if self.socket_path and os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+            if self.network is not None:
+                # Drain the memory indexing queue before exiting
+                self.network.close()
+
+    async def _load_network(self):
+        load_start = time.perf_counter()
+        try:
+            # Cheap now (HippoRAG loads on its own thread, other regions on first use), but keep it off the loop
+            self.network = await asyncio.to_thread(BrainNetwork)
+            print(f"[Server] Brain ready in {time.perf_counter() - load_start:.1f}s")
+        except Exception as e:
+            self.load_error = str(e)
+            print(f"[Server] Failed to build BrainNetwork: {e}")
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = (await reader.readline()).decode("latin-1").strip()
+            if not request_line:
+                return
+            method, path = request_line.split(" ")[:2]
+
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode("latin-1")
+                if line in ("\r\n", "\n", ""):
+                    break
+                key, _, value = line.partition(":")
+                headers[key.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get("content-length", 0) or 0))
+
+            status, payload = await self._route(method, path.split("?")[0], body)
+        except Exception as e:
+            status, payload = HTTPStatus.BAD_REQUEST, {"error": f"Malformed request: {e}"}
+
+        data = json.dumps(payload, default=str).encode("utf-8")
+        head = (
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            "Connection: close\r\n\r\n"
+        )
+        try:
+            writer.write(head.encode("latin-1") + data)
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def _route(self, method: str, path: str, body: bytes) -> tuple[HTTPStatus, dict]:
+        if path == "/healthz" and method == "GET":
+            return self._health()
+        if path == "/query" and method == "POST":
+            return await self._query(body)
+        return HTTPStatus.NOT_FOUND, {"error": f"No route for {method} {path}"}
+
+    def _health(self) -> tuple[HTTPStatus, dict]:
+        payload = {
+            "ready": self.network is not None,
+            "uptime": round(time.time() - self.started_at, 1),
+            "in_flight": self.in_flight,
+            "served": self.served,
+        }
+        if self.network is not None:
+            payload["memory_ready"] = self.network.hippo.is_ready
+            cache = self.network.hippo.retrieval_cache
+            if cache is not None:
+                payload["retrieval_cache"] = {"hits": cache.hits, "misses": cache.misses, "entries": len(cache.entries)}
+            if self.network.hippo.index_queue is not None:
+                payload["index_queue"] = self.network.hippo.index_queue.stats()
+        # Don't build the Left Hemisphere just to report on it
+        left = self.network.__dict__.get("left") if self.network is not None else None
+        if left is not None and left.memory_first:
+            payload["memory_first"] = {"searches_skipped": left.searches_skipped, "searches_shrunk": left.searches_shrunk}
+        if left is not None and left.cascade:
+            payload["left_cascade"] = {"attempts": left.cascade_attempts, "escalations": left.cascade_escalations,
+                                       "escalation_rate": round(left.escalation_rate(), 3)}
+        if self.load_error:
+            payload["error"] = self.load_error
+        status = HTTPStatus.OK if self.network is not None else HTTPStatus.SERVICE_UNAVAILABLE
+        return status, payload
+
+    async def _query(self, body: bytes) -> tuple[HTTPStatus, dict]:
+        if self.network is None:
+            return HTTPStatus.SERVICE_UNAVAILABLE, {"error": self.load_error or "Brain is still warming up."}
+
+        request = json.loads(body or b"{}")
+        query = request.get("query")
+        flow = request.get("flow", "auto")
+        if not query:
+            return HTTPStatus.BAD_REQUEST, {"error": "Missing 'query'."}
+        if flow not in FLOWS:
+            return HTTPStatus.BAD_REQUEST, {"error": f"Unknown flow '{flow}'. Choose from {FLOWS}."}
+
+        self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            ctx = await self.network.run(query, flow=flow, speculative=bool(request.get("speculative")),
+                                         fused=bool(request.get("fused")), deadline=request.get("deadline"))
+        except Exception as e:
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)}
+        finally:
+            self.in_flight -= 1
+            self.served += 1
+
+        payload = ctx.model_dump()
+        payload["elapsed"] = round(time.perf_counter() - start, 3)
+        if self.trace_dir:
+            payload["trace"] = write_trace(ctx, self.trace_dir, self.trace_format)
+        return HTTPStatus.OK, payload
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path: str, timeout: float):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class BrainClient:
+    """Minimal blocking client for BrainServer, over TCP or a Unix socket."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, socket_path: str | None = None, timeout: float = 300.0):
+        self.host = host
+        self.port = port
+        self.socket_path = socket_path
+        self.timeout = timeout
+
+    def _request(self, method: str, path: str, payload: dict | None = None) -> tuple[int, dict]:
+        if self.socket_path:
+            conn = _UnixHTTPConnection(self.socket_path, self.timeout)
+        else:
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            body = json.dumps(payload).encode("utf-8") if payload is not None else None
+            headers = {"Content-Type": "application/json"} if body else {}
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            return response.status, json.loads(response.read() or b"{}")
+        finally:
+            conn.close()
+
+    def health(self) -> dict:
+        return self._request("GET", "/healthz")[1]
+
+    def wait_until_ready(self, timeout: float = 120.0, interval: float = 0.5) -> bool:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                if self.health().get("ready"):
+                    return True
+            except OSError:
+                pass  # server not listening yet
+            time.sleep(interval)
+        return False
+
+    def query(self, query: str, flow: str = "auto", speculative: bool = False, fused: bool = False,
+              deadline: float | None = None) -> dict:
+        status, payload = self._request("POST", "/query", {"query": query, "flow": flow, "speculative": speculative,
+                                                           "fused": fused, "deadline": deadline})
+        if status != HTTPStatus.OK:
+            raise RuntimeError(f"Server returned {status}: {payload.get('error')}")
+        return payload
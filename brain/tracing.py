@@ -0,0 +1,150 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, Tuple
+from brain.schemas import BrainContext, Span
+
+# (trace the span belongs to, span) for whatever is running in the current task/thread.
+# asyncio tasks and asyncio.to_thread copy contextvars, so children find their parent automatically.
+_active: ContextVar[Optional[Tuple[List[Span], Span]]] = ContextVar("brain_active_span", default=None)
+
+
+@contextmanager
+def _open(spans: Optional[List[Span]], parent: Optional[Span], name: str, fields: dict) -> Iterator[Span]:
+    span = Span(name=name, parent_id=parent.span_id if parent else None, **fields)
+    if spans is not None:
+        spans.append(span)
+    token = _active.set((spans, span)) if spans is not None else None
+    try:
+        yield span
+    except BaseException as e:
+        span.error = span.error or f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        span.end = time.time()
+        if token is not None:
+            _active.reset(token)
+
+
+@contextmanager
+def stage_span(ctx: BrainContext, name: str, **fields) -> Iterator[Span]:
+    """Record a span on `ctx`, nested under the active span if it belongs to the same trace."""
+    active = _active.get()
+    parent = active[1] if active and active[0] is ctx.spans else None
+    with _open(ctx.spans, parent, name, fields) as span:
+        yield span
+
+
+@contextmanager
+def child_span(name: str, **fields) -> Iterator[Span]:
+    """Record a span under whatever span is active; a detached no-op span outside any trace."""
+    active = _active.get()
+    spans, parent = active if active else (None, None)
+    with _open(spans, parent, name, fields) as span:
+        yield span
+
+
+def add_child_span(name: str, start: float, end: float, **fields) -> Optional[Span]:
+    """Attach an already-measured interval (e.g. a library's internal timer) under the active span."""
+    active = _active.get()
+    if not active or active[0] is None:
+        return None
+    spans, parent = active
+    span = Span(name=name, parent_id=parent.span_id, start=start, end=end, **fields)
+    spans.append(span)
+    return span
+
+
+def record_usage(span: Span, usage_metadata) -> None:
+    """Copy token counts from a google-genai `usage_metadata` onto the span."""
+    if usage_metadata is None:
+        return
+    span.input_tokens = getattr(usage_metadata, "prompt_token_count", None)
+    output = getattr(usage_metadata, "candidates_token_count", None) or 0
+    thoughts = getattr(usage_metadata, "thoughts_token_count", None) or 0
+    span.output_tokens = output + thoughts
+    if thoughts:
+        span.attributes["thoughts_tokens"] = thoughts
+
+
+def _span_args(span: Span) -> dict:
+    args = {key: value for key, value in span.model_dump(exclude={"span_id", "parent_id", "name", "start", "end", "attributes"}).items()
+            if value is not None}
+    args.update(span.attributes)
+    return args
+
+
+def to_chrome_trace(ctx: BrainContext) -> dict:
+    """Chrome trace-event JSON (chrome://tracing, Perfetto). Each top-level span gets its own lane."""
+    by_id = {span.span_id: span for span in ctx.spans}
+    lanes = {}
+
+    def lane(span: Span) -> int:
+        while span.parent_id in by_id:
+            span = by_id[span.parent_id]
+        return lanes.setdefault(span.span_id, len(lanes) + 1)
+
+    events = []
+    for span in ctx.spans:
+        end = span.end if span.end is not None else time.time()
+        events.append({
+            "name": span.name,
+            "cat": span.region or "brain",
+            "ph": "X",
+            "ts": round(span.start * 1e6),
+            "dur": round((end - span.start) * 1e6),
+            "pid": 1,
+            "tid": lane(span),
+            "args": _span_args(span),
+        })
+    return {
+        "traceEvents": events,
+        "displayTimeUnit": "ms",
+        "otherData": {"trace_id": ctx.trace_id, "query": ctx.original_query, "stage": ctx.current_stage},
+    }
+
+
+def to_otlp(ctx: BrainContext) -> dict:
+    """OTLP/JSON-shaped export (resourceSpans → scopeSpans → spans)."""
+    def attribute(key, value):
+        if isinstance(value, bool):
+            return {"key": key, "value": {"boolValue": value}}
+        if isinstance(value, int):
+            return {"key": key, "value": {"intValue": str(value)}}
+        if isinstance(value, float):
+            return {"key": key, "value": {"doubleValue": value}}
+        return {"key": key, "value": {"stringValue": str(value)}}
+
+    spans = []
+    for span in ctx.spans:
+        end = span.end if span.end is not None else time.time()
+        record = {
+            "traceId": ctx.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(int(span.start * 1e9)),
+            "endTimeUnixNano": str(int(end * 1e9)),
+            "attributes": [attribute(key, value) for key, value in _span_args(span).items() if key != "error"],
+            "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+        }
+        if span.parent_id:
+            record["parentSpanId"] = span.parent_id
+        spans.append(record)
+
+    return {"resourceSpans": [{
+        "resource": {"attributes": [attribute("service.name", "dep-brain"), attribute("brain.query", ctx.original_query)]},
+        "scopeSpans": [{"scope": {"name": "brain.tracing"}, "spans": spans}],
+    }]}
+
+
+def write_trace(ctx: BrainContext, directory: str, fmt: str = "chrome") -> str:
+    """Write one query's trace to `<directory>/<trace_id>.json` and return the path."""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{ctx.trace_id}.json")
+    payload = to_otlp(ctx) if fmt == "otlp" else to_chrome_trace(ctx)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, default=str)
+    return path
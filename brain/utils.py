@@ -0,0 +1,44 @@
+import math
+import os
+from typing import List, Optional
+
+TRUE_VALUES = ("1", "true", "yes")
+FALSE_VALUES = ("0", "false", "no")
+
+# Every on-disk store (memory, caches, queues, router) lives under the Hippocampus directory,
+# so the brain's state can be moved or wiped as one
+STATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Hippocampus")
+
+
+def state_path(*parts: str) -> str:
+    """A path under the brain's state directory."""
+    return os.path.join(STATE_DIR, *parts)
+
+
+def env_flag(name: str, default: bool = False) -> bool:
+    """True for 1/true/yes (any case); unset or empty gives `default`."""
+    value = os.getenv(name, "").strip().lower()
+    return value in TRUE_VALUES if value else default
+
+
+def env_path(name: str, default_path: str, default_on: bool = True) -> Optional[str]:
+    """Where a store toggled by one variable lives, or None when it is off.
+
+    0/false/no turns it off, 1/true/yes means `default_path`, anything else is a file path.
+    Unset or empty means `default_path` when `default_on`, off otherwise.
+    """
+    value = os.getenv(name, "").strip()
+    if not value:
+        return default_path if default_on else None
+    if value.lower() in FALSE_VALUES:
+        return None
+    return default_path if value.lower() in TRUE_VALUES else value
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile; 0.0 for an empty list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
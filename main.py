@@ -1,46 +1,156 @@
 import argparse
 import asyncio
 import os
+import sys
 from dotenv import load_dotenv
 from brain.network import BrainNetwork
+from brain.tracing import write_trace
 
 # Load env variables
 load_dotenv()
 
-async def main():
+FLOWS = ["auto", "sequential", "parallel", "logical", "creative", "fast"]
+
+async def run_query(argv):
     parser = argparse.ArgumentParser(description="DEP Agentic Brain CLI")
     parser.add_argument("query", type=str, help="The query to process")
-    parser.add_argument("--flow", choices=["auto", "sequential", "parallel", "logical", "creative", "fast"], default="auto", help="The processing flow")
-    
-    args = parser.parse_args()
-    
-    if not os.getenv("GEMINI_API_KEY"):
-        print("Error: GEMINI_API_KEY not set in .env or environment.")
-        return
+    parser.add_argument("--flow", choices=FLOWS, default="auto", help="The processing flow")
+    parser.add_argument("--speculative", action="store_true", help="Auto mode: prefetch search and memories while the router decides")
+    parser.add_argument("--stream", action="store_true", help="Print the final stage's tokens as they arrive")
+    parser.add_argument("--fused", action="store_true", help="Auto mode: route and plan in a single LLM call")
+    parser.add_argument("--deadline", type=float, default=None, help="Latency budget in seconds; stages degrade as it runs short")
+    parser.add_argument("--trace-dir", default=None, help="Write a per-query trace (spans per stage and LLM call) here")
+    parser.add_argument("--trace-format", choices=["chrome", "otlp"], default="chrome")
+
+    args = parser.parse_args(argv)
 
     print(f"Initializing DEP Brain [Mode: {args.flow.upper()}]...")
-    
+
     network = BrainNetwork()
-    
+
+    on_token = None
+    if args.stream:
+        started = []
+        def on_token(text: str):
+            if not started:
+                started.append(True)
+                print("\n--- Final Output ---")
+            print(text, end="", flush=True)
+
     try:
-        if args.flow == "auto":
-             result = await network.run_dynamic(args.query)
-        elif args.flow == "fast":
-            result = network.run_fast(args.query)
-        elif args.flow == "sequential":
-            result = network.run_sequential(args.query)
-        elif args.flow == "logical":
-            result = network.run_logical(args.query)
-        elif args.flow == "creative":
-            result = network.run_creative(args.query)
+        result = await network.run(args.query, flow=args.flow, speculative=args.speculative, fused=args.fused,
+                                   on_token=on_token, deadline=args.deadline)
+
+        if args.trace_dir:
+            print(f"[Trace] {write_trace(result, args.trace_dir, args.trace_format)}")
+
+        if args.stream and result.time_to_first_token is not None:
+            print(f"\n\n[Time to first token: {result.time_to_first_token:.2f}s]")
         else:
-            result = await network.run_parallel(args.query)
-            
-        print("\n--- Final Output ---")
-        print(result.final_output)
-        
+            print("\n--- Final Output ---")
+            print(result.final_output)
+
     except Exception as e:
         print(f"\nSystem Error: {str(e)}")
 
+async def serve(argv):
+    from brain.server import BrainServer
+
+    parser = argparse.ArgumentParser(prog="main.py serve", description="Serve one warm DEP Brain over HTTP/JSON")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--socket", default=None, help="Also listen on this Unix socket path")
+    parser.add_argument("--trace-dir", default=None, help="Write a trace per served query here")
+    parser.add_argument("--trace-format", choices=["chrome", "otlp"], default="chrome")
+    args = parser.parse_args(argv)
+
+    await BrainServer(args.host, args.port, args.socket, args.trace_dir, args.trace_format).serve_forever()
+
+async def batch(argv):
+    from brain.batch import run_batch
+
+    parser = argparse.ArgumentParser(prog="main.py batch", description="Run a JSONL file of queries through one DEP Brain")
+    parser.add_argument("--input", required=True, help='JSONL with one {"id", "query", "flow"?} object per line')
+    parser.add_argument("--output", default=None, help="Results JSONL (default: <input>.results.jsonl); resumed if it exists")
+    parser.add_argument("--concurrency", type=int, default=8, help="Max queries in flight")
+    parser.add_argument("--flow", choices=FLOWS, default="auto", help="Flow for lines that don't set one")
+    parser.add_argument("--speculative", action="store_true")
+    parser.add_argument("--fused", action="store_true")
+    parser.add_argument("--deadline", type=float, default=None, help="Per-query latency budget in seconds")
+    parser.add_argument("--trace-dir", default=None, help="Write a trace per query here")
+    parser.add_argument("--trace-format", choices=["chrome", "otlp"], default="chrome")
+    args = parser.parse_args(argv)
+
+    output = args.output or f"{os.path.splitext(args.input)[0]}.results.jsonl"
+    stats = await run_batch(BrainNetwork(), args.input, output, args.concurrency, args.flow, args.speculative, args.fused,
+                            args.trace_dir, args.trace_format, args.deadline)
+
+    print("\n--- Batch Summary ---")
+    print(f"Completed: {stats['completed']}  Failed: {stats['failed']}  Skipped (resumed): {stats['skipped']}")
+    print(f"Wall time: {stats['wall_time']:.1f}s  Throughput: {stats['throughput_qps']:.2f} queries/s")
+    print(f"Latency p50: {stats['p50']:.2f}s  p95: {stats['p95']:.2f}s  p99: {stats['p99']:.2f}s")
+    print(f"Results: {output}")
+
+def train_router(argv):
+    from brain.Prefrontal_Cortex.local_router import DEFAULT_LOG_PATH, DEFAULT_MODEL_PATH, train_from_log
+
+    parser = argparse.ArgumentParser(prog="main.py train-router", description="Retrain the local flow router from logged PFC decisions")
+    parser.add_argument("--log", default=DEFAULT_LOG_PATH, help="Routing log JSONL written by the LLM router")
+    parser.add_argument("--model", default=DEFAULT_MODEL_PATH, help="Where to save the trained router")
+    parser.add_argument("--min-examples", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    try:
+        report = train_from_log(args.log, args.model, args.min_examples)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+    print(f"Trained on {report['examples']} decisions {report['class_counts']}")
+    print(f"Held-out accuracy: {report['holdout_accuracy']:.1%}")
+    print(f"Saved to {report['model_path']}")
+
+def client(argv):
+    from brain.server import BrainClient
+
+    parser = argparse.ArgumentParser(prog="main.py client", description="Send a query to a running DEP Brain server")
+    parser.add_argument("query", nargs="?", help="The query to process (omit to just check /healthz)")
+    parser.add_argument("--flow", choices=FLOWS, default="auto")
+    parser.add_argument("--speculative", action="store_true")
+    parser.add_argument("--fused", action="store_true")
+    parser.add_argument("--deadline", type=float, default=None, help="Latency budget in seconds")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--socket", default=None, help="Connect through this Unix socket instead of TCP")
+    args = parser.parse_args(argv)
+
+    brain = BrainClient(args.host, args.port, args.socket)
+    if not args.query:
+        print(brain.health())
+        return
+    if not brain.wait_until_ready():
+        print("Error: server did not become ready.")
+        return
+    result = brain.query(args.query, flow=args.flow, speculative=args.speculative, fused=args.fused, deadline=args.deadline)
+    print(f"--- Final Output ({result['elapsed']:.2f}s) ---")
+    print(result["final_output"])
+
+async def main():
+    argv = sys.argv[1:]
+
+    if argv and argv[0] == "client":
+        return client(argv[1:])
+    if argv and argv[0] == "train-router":
+        return train_router(argv[1:])
+
+    if not os.getenv("GEMINI_API_KEY"):
+        print("Error: GEMINI_API_KEY not set in .env or environment.")
+        return
+
+    if argv and argv[0] == "serve":
+        return await serve(argv[1:])
+    if argv and argv[0] == "batch":
+        return await batch(argv[1:])
+    return await run_query(argv)
+
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,73 @@
+import random
+
+import pytest
+
+from brain.Hippocampus.dedup import SignatureIndex, bands, hamming_distance, normalize_url, simhash
+
+ARTICLE = ("The James Webb Space Telescope captured new images of the Pillars of Creation, showing "
+           "newly formed stars hidden in the dust. Astronomers say the infrared data reveals details "
+           "that Hubble could not see, including jets from young stars and thin walls of gas.")
+
+
+def flip_bits(value: int, count: int, rng: random.Random) -> int:
+    for bit in rng.sample(range(64), count):
+        value ^= 1 << bit
+    return value
+
+
+@pytest.mark.parametrize("max_distance", [0, 3, 5, 8])
+def test_band_lookup_finds_every_hash_within_the_distance(tmp_path, max_distance):
+    rng = random.Random(max_distance)
+    index = SignatureIndex(str(tmp_path / "sig.sqlite"), max_distance=max_distance)
+    stored = rng.getrandbits(64)
+    index.add([("", "stored", stored)])
+
+    for i in range(200):
+        near = flip_bits(stored, rng.randint(0, max_distance), rng)
+        assert index._duplicate_of("", f"near{i}", near) == "near"
+    assert index._duplicate_of("", "far", flip_bits(stored, max_distance + 1, rng)) is None
+
+
+@pytest.mark.parametrize("count", [1, 4, 6, 9])
+def test_bands_cover_all_bits(count):
+    value = random.Random(count).getrandbits(64)
+    width = 64 // count
+    rebuilt = sum(band << (i * width) for i, band in enumerate(bands(value, count)))
+    assert rebuilt == value
+
+
+def test_changing_the_distance_rebuilds_the_bands(tmp_path):
+    path = str(tmp_path / "sig.sqlite")
+    stored = random.Random(1).getrandbits(64)
+    SignatureIndex(path, max_distance=3).add([("", "stored", stored)])
+
+    wider = SignatureIndex(path, max_distance=6)
+    assert wider._conn.execute("SELECT COUNT(*) FROM bands").fetchone()[0] == 7
+    assert wider._duplicate_of("", "near", flip_bits(stored, 6, random.Random(2))) == "near"
+
+
+def test_filter_drops_seen_urls_content_and_near_duplicates(tmp_path):
+    index = SignatureIndex(str(tmp_path / "sig.sqlite"))
+    first = {"url": "https://www.example.com/webb?utm_source=x", "content": ARTICLE}
+    fresh, signatures = index.filter([first])
+    index.add(signatures)
+
+    repeats = [
+        {"url": "http://example.com/webb/", "content": "something else entirely"},
+        {"url": "https://other.org/a", "content": ARTICLE.upper()},
+        {"url": "https://other.org/b", "content": ARTICLE + " Image credit NASA."},
+        {"url": "https://other.org/c", "content": "A recipe for lemon cake with three eggs and a cup of sugar."},
+    ]
+    fresh, _ = index.filter(repeats)
+    assert [r["url"] for r in fresh] == ["https://other.org/c"]
+    assert index.skipped == {"url": 1, "hash": 1, "near": 1}
+
+
+def test_near_identical_text_has_a_small_hamming_distance():
+    assert hamming_distance(simhash(ARTICLE), simhash(ARTICLE + " Image credit NASA.")) <= 3
+    assert hamming_distance(simhash(ARTICLE), simhash("A recipe for lemon cake with three eggs.")) > 3
+
+
+def test_normalize_url():
+    assert normalize_url("https://www.Example.com/path/?utm_source=x&b=2&a=1#frag") == "example.com/path?a=1&b=2"
+    assert normalize_url("") == ""
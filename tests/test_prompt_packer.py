@@ -0,0 +1,40 @@
+from brain.prompt_packer import PromptPacker, format_bullets
+from brain.rate_limit import estimate_tokens
+
+
+def test_duplicates_across_sections_keep_the_earlier_copy():
+    result = PromptPacker(1000).pack("gravity", {
+        "memories": ["Gravity pulls masses together."],
+        "search": ["gravity pulls masses together", "Einstein described gravity as curved spacetime."],
+    })
+    assert result.sections["memories"] == ["Gravity pulls masses together."]
+    assert result.sections["search"] == ["Einstein described gravity as curved spacetime."]
+    assert result.duplicates == 1
+
+
+def test_budget_keeps_the_most_relevant_items():
+    relevant = "Black holes bend light through gravity."
+    filler = "The bakery on the corner sells bread every morning."
+    budget = estimate_tokens(relevant) + 2
+    result = PromptPacker(budget).pack("black holes gravity", {"search": [filler, relevant]})
+    assert result.sections["search"] == [relevant]
+    assert result.dropped == 1
+    assert result.tokens <= budget
+
+
+def test_reserved_tokens_shrink_the_budget():
+    item = "Photosynthesis turns light into chemical energy."
+    packer = PromptPacker(estimate_tokens(item))
+    assert packer.pack("photosynthesis", {"facts": [item]}).sections["facts"] == [item]
+    assert packer.pack("photosynthesis", {"facts": [item]}, reserved_tokens=1).sections["facts"] == []
+
+
+def test_keep_order_sections_are_not_reranked():
+    steps = ["First, define the unrelated terms.", "Then compute the orbit of the moon."]
+    result = PromptPacker(1000).pack("moon orbit", {"facts": steps}, keep_order=["facts"])
+    assert result.sections["facts"] == steps
+
+
+def test_format_bullets():
+    assert format_bullets(["a", "b"]) == "- a\n- b"
+    assert format_bullets([]) == "None."
@@ -0,0 +1,74 @@
+import pytest
+
+from brain import rate_limit
+from brain.rate_limit import RateLimiter, TokenBucket, estimate_tokens, parse_rate_limits
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limit.time, "monotonic", clock)
+    return clock
+
+
+def test_full_bucket_does_not_wait(clock):
+    bucket = TokenBucket(60)
+    assert bucket.reserve(60) == 0.0
+
+
+def test_wait_is_the_deficit_over_the_refill_rate(clock):
+    bucket = TokenBucket(60)  # one token per second
+    bucket.reserve(60)
+    assert bucket.reserve(1) == pytest.approx(1.0)
+    # Callers queue: the next one waits behind the first
+    assert bucket.reserve(2) == pytest.approx(3.0)
+
+
+def test_bucket_refills_over_time(clock):
+    bucket = TokenBucket(60)
+    bucket.reserve(60)
+    clock.now += 30
+    assert bucket.reserve(30) == 0.0
+    assert bucket.reserve(1) == pytest.approx(1.0)
+
+
+def test_refill_is_capped_at_capacity(clock):
+    bucket = TokenBucket(60)
+    clock.now += 600
+    bucket.reserve(60)
+    assert bucket.reserve(1) == pytest.approx(1.0)
+
+
+def test_oversized_request_waits_for_at_most_one_full_bucket(clock):
+    bucket = TokenBucket(60)
+    bucket.reserve(60)
+    assert bucket.reserve(10_000) == pytest.approx(60.0)
+
+
+def test_limiter_waits_for_the_slower_bucket_and_settles(clock):
+    limiter = RateLimiter(rpm=600, tpm=600)  # 10 requests/s, 10 tokens/s
+    assert limiter.reserve(600) == 0.0
+    assert limiter.reserve(100) == pytest.approx(10.0)
+    # The first call used 500 tokens fewer than estimated: the refund clears the debt
+    limiter.settle(600, 100)
+    assert limiter.token_bucket.reserve(0) == pytest.approx(0.0)
+
+
+def test_parse_rate_limits():
+    assert parse_rate_limits("gemini-3-pro-preview=10:200000, default=60:") == {
+        "gemini-3-pro-preview": (10, 200000),
+        "default": (60, None),
+    }
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 1
+    assert estimate_tokens("x" * 400) == 101
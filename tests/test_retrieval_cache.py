@@ -0,0 +1,51 @@
+from types import SimpleNamespace
+
+from brain.Hippocampus.retrieval_cache import RetrievalCache
+from brain.schemas import MemoryRecall
+
+CONFIG = SimpleNamespace(retrieval_top_k=200, linking_top_k=5, damping=0.5, passage_node_weight=0.05,
+                         embedding_model_name="gemini-embedding", llm_name="gemini-1.5-flash")
+
+
+def recall(*docs):
+    return MemoryRecall(docs=list(docs), scores=[1.0] * len(docs), confidence=0.9)
+
+
+def test_hit_returns_a_copy():
+    cache = RetrievalCache()
+    key = cache.key(["q"], 4, CONFIG)
+    assert cache.get(key, 0) is None
+    cache.put(key, 0, recall("a"))
+
+    hit = cache.get(key, 0)
+    hit.docs.append("mutated")
+    assert cache.get(key, 0).docs == ["a"]
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_new_index_version_invalidates():
+    cache = RetrievalCache()
+    key = cache.key(["q"], 4, CONFIG)
+    cache.put(key, 0, recall("a"))
+    assert cache.get(key, 1) is None
+    # A result computed against the old graph is not stored once the new one is seen
+    cache.put(key, 0, recall("stale"))
+    assert cache.get(key, 1) is None
+
+
+def test_key_depends_on_queries_k_and_config():
+    base = RetrievalCache.key(["q", "step"], 4, CONFIG)
+    assert base != RetrievalCache.key(["step", "q"], 4, CONFIG)
+    assert base != RetrievalCache.key(["q", "step"], 5, CONFIG)
+    assert base != RetrievalCache.key(["q", "step"], 4, SimpleNamespace(**{**vars(CONFIG), "damping": 0.8}))
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = RetrievalCache(max_entries=2)
+    keys = [cache.key([q], 4, CONFIG) for q in ("a", "b", "c")]
+    cache.put(keys[0], 0, recall("a"))
+    cache.put(keys[1], 0, recall("b"))
+    cache.get(keys[0], 0)
+    cache.put(keys[2], 0, recall("c"))
+    assert cache.get(keys[1], 0) is None
+    assert cache.get(keys[0], 0) is not None
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+from brain.core import DeadlineExceeded
+from brain.Prefrontal_Cortex import routing_engine
+from brain.Prefrontal_Cortex.local_router import LocalRouter, tokenize
+from brain.Prefrontal_Cortex.routing_engine import PFCRouter
+
+EXAMPLES = [
+    ("solve this integral step by step", "logical"),
+    ("prove that the sum of two even numbers is even", "logical"),
+    ("what is the derivative of x squared", "logical"),
+    ("write a poem about the sea", "creative"),
+    ("tell me a story about a dragon", "creative"),
+    ("write a short poem about autumn leaves", "creative"),
+    ("hi", "fast"),
+    ("hello there", "fast"),
+]
+
+
+class FakeLLM:
+    def __init__(self, response=None, error=None):
+        self.response = response
+        self.error = error
+        self.calls = 0
+
+    async def agenerate(self, system_prompt, user_content, **kwargs):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return self.response
+
+
+@pytest.fixture(autouse=True)
+def no_routing_log(monkeypatch):
+    # LLM decisions are logged as training data; keep the tests off the real log
+    monkeypatch.setattr(routing_engine, "log_decision", lambda query, flow: None)
+
+
+def test_local_router_learns_flows():
+    router = LocalRouter().fit(EXAMPLES)
+    assert router.predict("write a poem about the moon")[0] == "creative"
+    assert router.predict("solve the integral of x")[0] == "logical"
+    flow, confidence = router.predict("hello")
+    assert flow == "fast" and 0.0 < confidence <= 1.0
+
+
+def test_untrained_local_router_abstains():
+    assert LocalRouter().predict("anything") == (None, 0.0)
+
+
+def test_local_router_round_trips(tmp_path):
+    path = str(tmp_path / "router.json")
+    LocalRouter().fit(EXAMPLES).save(path)
+    loaded = LocalRouter.load(path)
+    assert loaded.predict("tell me a story") == LocalRouter().fit(EXAMPLES).predict("tell me a story")
+
+
+def test_tokenize_lowercases():
+    assert "poem" in tokenize("Write a POEM")
+
+
+def test_confident_local_router_skips_the_llm():
+    llm = FakeLLM('{"flow": "parallel", "content": null}')
+    router = PFCRouter(llm, local_router=LocalRouter().fit(EXAMPLES), confidence_threshold=0.5)
+    flow, content = asyncio.run(router.decide_flow("write a poem about the stars"))
+    assert (flow, content, llm.calls) == ("creative", None, 0)
+
+
+def test_unsure_local_router_defers_to_the_llm():
+    llm = FakeLLM('{"flow": "parallel", "content": null}')
+    router = PFCRouter(llm, local_router=LocalRouter().fit(EXAMPLES), confidence_threshold=1.01)
+    assert asyncio.run(router.decide_flow("write a poem"))[0] == "parallel"
+    assert llm.calls == 1
+
+
+def test_llm_fast_answer_and_code_fences():
+    router = PFCRouter(FakeLLM('```json\n{"flow": "fast", "content": "Hello!"}\n```'))
+    assert asyncio.run(router.decide_flow("hi")) == ("fast", "Hello!")
+
+
+@pytest.mark.parametrize("response", ['{"flow": "dance"}', "not json"])
+def test_bad_llm_answers_fall_back_to_sequential(response):
+    assert asyncio.run(PFCRouter(FakeLLM(response)).decide_flow("q")) == ("sequential", None)
+
+
+def test_deadline_propagates_instead_of_falling_back():
+    router = PFCRouter(FakeLLM(error=DeadlineExceeded("late")))
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(router.decide_flow("q"))
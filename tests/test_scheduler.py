@@ -0,0 +1,90 @@
+import asyncio
+import time
+
+import pytest
+
+from brain.scheduler import FlowGraph, Stage
+from brain.schemas import BrainContext
+
+
+def sleeper(field, value, seconds=0.1, log=None):
+    async def run(ctx):
+        if log is not None:
+            log.append(("start", field, ctx.plan))
+        await asyncio.sleep(seconds)
+        setattr(ctx, field, value)
+        return ctx
+    return run
+
+
+def test_independent_stages_overlap():
+    graph = FlowGraph("t", [
+        Stage("plan", sleeper("plan", ["step"]), outputs=("plan",)),
+        Stage("recall", sleeper("memories", ["m"]), inputs=("plan",), outputs=("memories",)),
+        Stage("search", sleeper("search_results", [{"content": "r"}]), inputs=("plan",), outputs=("search_results",)),
+    ])
+    start = time.perf_counter()
+    ctx = asyncio.run(graph.run(BrainContext(original_query="q")))
+    elapsed = time.perf_counter() - start
+
+    # plan, then recall and search side by side: two sleeps, not three
+    assert elapsed < 0.28
+    assert ctx.memories == ["m"] and ctx.search_results == [{"content": "r"}]
+
+
+def test_stage_sees_only_its_inputs():
+    log = []
+    graph = FlowGraph("t", [
+        Stage("plan", sleeper("plan", ["step"], 0.01), outputs=("plan",)),
+        Stage("blind", sleeper("memories", ["m"], 0.01, log), outputs=("memories",)),
+        Stage("sighted", sleeper("search_results", [], 0.01, log), inputs=("plan",), outputs=("search_results",)),
+    ])
+    asyncio.run(graph.run(BrainContext(original_query="q")))
+    assert ("start", "memories", None) in log
+    assert ("start", "search_results", ["step"]) in log
+
+
+def test_failure_cancels_and_awaits_running_stages():
+    unwound = []
+
+    async def slow(ctx):
+        try:
+            await asyncio.sleep(5)
+        finally:
+            unwound.append("slow")
+        return ctx
+
+    async def broken(ctx):
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    graph = FlowGraph("t", [
+        Stage("slow", slow, outputs=("memories",)),
+        Stage("broken", broken, outputs=("search_results",)),
+    ])
+    with pytest.raises(ValueError):
+        asyncio.run(graph.run(BrainContext(original_query="q")))
+    assert unwound == ["slow"]
+
+
+def test_seeded_outputs_skip_their_stage():
+    ran = []
+
+    async def plan(ctx):
+        ran.append("plan")
+        return ctx
+
+    graph = FlowGraph("t", [Stage("plan", plan, outputs=("plan",))])
+    asyncio.run(graph.run(BrainContext(original_query="q", plan=["precomputed"])))
+    assert ran == []
+
+
+def test_cycles_and_unknown_fields_are_rejected():
+    noop = sleeper("plan", [], 0)
+    with pytest.raises(ValueError, match="cycle"):
+        FlowGraph("t", [
+            Stage("a", noop, inputs=("memories",), outputs=("plan",)),
+            Stage("b", noop, inputs=("plan",), outputs=("memories",)),
+        ])
+    with pytest.raises(ValueError, match="unknown context field"):
+        FlowGraph("t", [Stage("a", noop, outputs=("nonsense",))])